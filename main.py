@@ -76,13 +76,20 @@ def process_batch(pmid_batch: List[str], db: PaperDatabase, query_id: int = None
     pmids_to_process = []  # New papers
     papers_to_enrich = []  # Existing papers missing abstract or full text
     
+    # One bulk existence check; full rows are only loaded for existing papers that need enriching
+    existing_pmids = db.papers_exist(pmid_batch)
+    papers_needing_enrichment = {}
+    if not skip_existing:
+        papers_needing_enrichment = db.get_papers_needing_enrichment([pmid for pmid in pmid_batch if pmid in existing_pmids])
+    
     for pmid in pmid_batch:
-        needs_enrichment, existing_paper = db.paper_needs_enrichment(pmid)
-        
-        if existing_paper is None:
+        if pmid not in existing_pmids:
             # Paper doesn't exist - add to new papers list
             pmids_to_process.append(pmid)
-        elif needs_enrichment and not skip_existing:
+            continue
+        
+        existing_paper = papers_needing_enrichment.get(pmid)
+        if existing_paper is not None:
             # Paper exists but needs enrichment (only if enrichment is enabled)
             papers_to_enrich.append(existing_paper)
         else:
@@ -141,7 +148,7 @@ def process_batch(pmid_batch: List[str], db: PaperDatabase, query_id: int = None
         with FullTextExecutor(max_workers=FULLTEXT_PARALLEL_WORKERS) as ft_executor:
             futures = {ft_executor.submit(fetch_fulltext_for_paper, paper): paper 
                       for paper in papers_with_pmcid}
-            for future in futures:
+            for future in as_completed(futures):
                 try:
                     future.result()  # Updates metadata in place
                 except Exception as e:
@@ -153,7 +160,7 @@ def process_batch(pmid_batch: List[str], db: PaperDatabase, query_id: int = None
         with FullTextExecutor(max_workers=FULLTEXT_PARALLEL_WORKERS) as ft_executor:
             futures = {ft_executor.submit(fetch_fulltext_for_paper, paper): paper 
                       for paper in papers_without_pmcid}
-            for future in futures:
+            for future in as_completed(futures):
                 try:
                     future.result()  # Updates metadata in place
                 except Exception as e:
@@ -165,18 +172,22 @@ def process_batch(pmid_batch: List[str], db: PaperDatabase, query_id: int = None
         with FullTextExecutor(max_workers=FULLTEXT_PARALLEL_WORKERS) as ft_executor:
             futures = {ft_executor.submit(fetch_fulltext_for_paper, paper): paper 
                       for paper in papers_to_enrich}
-            for future in futures:
+            enriched_papers_to_save = []
+            for future in as_completed(futures):
                 try:
                     enriched_paper = future.result()
                     # Check if enrichment was successful
                     if enriched_paper.full_text or enriched_paper.abstract:
-                        # Update in database
-                        if db.insert_paper(enriched_paper):  # INSERT OR REPLACE
-                            enriched += 1
-                            print(f"  ✓ Enriched PMID {enriched_paper.pmid}: "
-                                  f"{'full_text' if enriched_paper.is_full_text_pmc else 'abstract only'}")
+                        enriched_papers_to_save.append(enriched_paper)
                 except Exception as e:
                     print(f"  ✗ Error enriching existing paper: {e}")
+        # Update all enriched papers in the database in one transaction;
+        # only the papers actually saved are reported as enriched
+        saved_enriched = db.insert_papers_batch(enriched_papers_to_save)
+        enriched += len(saved_enriched)
+        for enriched_paper in saved_enriched:
+            print(f"  ✓ Enriched PMID {enriched_paper.pmid}: "
+                  f"{'full_text' if enriched_paper.is_full_text_pmc else 'abstract only'}")
     
     # Process all papers (with and without full text)
     all_papers_to_save = papers_with_pmcid + papers_without_pmcid
@@ -214,36 +225,31 @@ def process_batch(pmid_batch: List[str], db: PaperDatabase, query_id: int = None
         # Combine enriched and non-enriched papers
         all_papers_final = enriched_papers + papers_without_doi
     
-    for metadata in all_papers_final:
-        if metadata is None:
-            failed += 1
-            continue
-        
-        openalex_success = metadata.openalex_retrieved if hasattr(metadata, 'openalex_retrieved') else False
-        
-        # Save to database
-        if db.insert_paper(metadata):
-            processed += 1
-            if metadata.is_full_text_pmc:
-                with_fulltext += 1
-            if openalex_success:
-                with_openalex += 1
-            
-            # Track papers without full text
-            if not metadata.is_full_text_pmc and metadata.doi:
-                db.add_failed_doi(
-                    metadata.doi,
-                    metadata.pmid,
-                    "No PMC full text available",
-                    datetime.now().isoformat()
-                )
-        else:
-            failed += 1
+    papers_to_save = [metadata for metadata in all_papers_final if metadata is not None]
+    failed += len(all_papers_final) - len(papers_to_save)
+    
+    # Track papers without full text
+    timestamp = datetime.now().isoformat()
+    failed_dois = [
+        (metadata.doi, metadata.pmid, "No PMC full text available", timestamp)
+        for metadata in papers_to_save
+        if not metadata.is_full_text_pmc and metadata.doi
+    ]
+    
+    # Save papers and failed DOIs to database in a single transaction
+    saved = db.insert_papers_batch(papers_to_save, failed_dois=failed_dois)
+    processed += len(saved)
+    failed += len(papers_to_save) - len(saved)
+    for metadata in saved:
+        if metadata.is_full_text_pmc:
+            with_fulltext += 1
+        if getattr(metadata, 'openalex_retrieved', False):
+            with_openalex += 1
     
     return processed, with_fulltext, with_openalex, failed, skipped, enriched
 
 
-def collect_papers(query: str, max_results: int = 50000, use_threading: bool = True, output_dir: str = None, query_description: str = None, query_id: int = None, check_num: bool | int = None, skip_existing: bool = True):
+def collect_papers(query: str, max_results: int = 50000, use_threading: bool = True, output_dir: str = None, query_description: str = None, query_id: int = None, check_num: bool | int = None, skip_existing: bool = True, database_filename: str = 'papers.db'):
     """
     Main function to collect papers from PubMed.
     
@@ -256,11 +262,12 @@ def collect_papers(query: str, max_results: int = 50000, use_threading: bool = T
         query_description: Optional description for the query
         query_id: Optional query ID (if None, a new query will be created in the database)
         skip_existing: If True, skip ALL papers already in database (no enrichment). Default: True
+        database_filename: Database file name under <output_dir>/data (only used with output_dir)
     """
     # Set custom output directory if provided
     if output_dir:
         from src.config import set_output_directory
-        paths = set_output_directory(output_dir)
+        paths = set_output_directory(output_dir, database_filename=database_filename)
         print("\n" + "="*60)
         print("PUBMED PAPER COLLECTION SYSTEM")
         print("="*60)
@@ -293,9 +300,7 @@ def collect_papers(query: str, max_results: int = 50000, use_threading: bool = T
     # Initialize database
     print("Step 2: Initializing database...")
     if output_dir:
-        # Use the updated DATABASE_PATH from config after set_output_directory was called
-        from src.config import DATABASE_PATH
-        db = PaperDatabase(db_path=DATABASE_PATH)
+        db = PaperDatabase(db_path=paths['database_path'])
     else:
         db = PaperDatabase()
     print(f"Database initialized at: {db.db_path}\n")
@@ -355,9 +360,10 @@ def collect_papers(query: str, max_results: int = 50000, use_threading: bool = T
                           f"Skipped (already in DB): {total_skipped}")
     else:
         # Single-threaded processing (for debugging)
+        missing_pmids = set(db.find_missing_pmids(pmid_list))
         for i, pmid in enumerate(tqdm(pmid_list, desc="Processing papers")):
             # Skip if paper already exists in database
-            if db.paper_exists(pmid):
+            if pmid not in missing_pmids:
                 total_skipped += 1
                 continue
             
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Shared SQLite helpers for maintenance scripts that work on papers.db directly
+"""
+import sqlite3
+import os
+import json
+import hashlib
+from contextlib import contextmanager
+from typing import Optional, Dict
+
+
+# Connection settings for script workloads (bulk reads, duplicate scans, mass deletes)
+TUNED_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",        # Readers don't block the writer, fewer fsyncs
+    "PRAGMA synchronous = NORMAL",      # Safe with WAL, skips the fsync on every commit
+    "PRAGMA temp_store = MEMORY",       # GROUP BY / ORDER BY temp tables stay in RAM
+    "PRAGMA cache_size = -1000000",     # Page cache up to ~1 GB (negative = KiB)
+    "PRAGMA mmap_size = 268435456",     # Memory-map the first 256 MB of the file
+    "PRAGMA busy_timeout = 5000",       # Wait up to 5s on a locked DB instead of failing
+)
+
+
+def open_tuned(db_path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite connection with performance PRAGMAs applied.
+
+    Args:
+        db_path: Path to the SQLite database
+
+    Returns:
+        sqlite3.Connection with WAL journaling and tuned cache settings
+    """
+    conn = sqlite3.connect(db_path)
+    for pragma in TUNED_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def close_tuned(conn: sqlite3.Connection):
+    """
+    Refresh query-planner statistics with PRAGMA optimize, then close.
+    
+    The pragma only analyzes tables whose stats look stale, so it is cheap;
+    failing it (e.g. under lock contention) must not block closing.
+    """
+    try:
+        conn.execute("PRAGMA optimize")
+    except sqlite3.Error:
+        pass
+    conn.close()
+
+
+@contextmanager
+def immediate_transaction(conn: sqlite3.Connection):
+    """
+    Run a block of writes as one transaction that takes the write lock up front.
+
+    BEGIN IMMEDIATE avoids SQLITE_BUSY upgrades halfway through a bulk write;
+    the block is committed once on success and rolled back on any error.
+
+    Args:
+        conn: Open SQLite connection with no transaction in progress
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def db_fingerprint(db_path: str) -> list:
+    """
+    Identify the current on-disk state of a database by (mtime_ns, size) of the
+    main file and its WAL, so any committed write changes the fingerprint.
+    """
+    fingerprint = []
+    for path in (db_path, db_path + "-wal"):
+        try:
+            st = os.stat(path)
+            fingerprint.extend([st.st_mtime_ns, st.st_size])
+        except FileNotFoundError:
+            fingerprint.extend([0, 0])
+    return fingerprint
+
+
+def _analysis_cache_file(db_path: str, name: str) -> str:
+    """Cache file for an analysis, next to the collection's query cache (<base>/cache)"""
+    db_path = os.path.abspath(db_path)
+    cache_dir = os.path.join(os.path.dirname(os.path.dirname(db_path)), 'cache', 'analysis')
+    db_hash = hashlib.md5(db_path.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f"{name}_{db_hash}.json")
+
+
+def load_cached_analysis(db_path: str, name: str) -> Optional[Dict]:
+    """
+    Load a cached analysis result if the database is unchanged since it was saved.
+    
+    Args:
+        db_path: Path to the SQLite database the analysis was run on
+        name: Analysis name (one cache entry per analysis and database)
+    
+    Returns:
+        The cached result dict, or None on a miss or stale entry
+    """
+    try:
+        with open(_analysis_cache_file(db_path, name), 'r') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    if entry.get('fingerprint') != db_fingerprint(db_path):
+        return None
+    return entry.get('result')
+
+
+def save_cached_analysis(db_path: str, name: str, result: Dict):
+    """
+    Save an analysis result keyed on the database's current fingerprint.
+    
+    Call this after the analysis connection is closed, so a WAL checkpoint
+    on close is already reflected in the fingerprint.
+    """
+    cache_file = _analysis_cache_file(db_path, name)
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(cache_file, 'w') as f:
+            json.dump({'fingerprint': db_fingerprint(db_path), 'result': result}, f)
+    except OSError as e:
+        print(f"Warning: Could not save analysis cache: {e}")
@@ -6,38 +6,40 @@ import sys
 import os
 import sqlite3
 from collections import defaultdict
+from itertools import groupby
+from typing import Dict
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def check_doi_duplicates(db_path: str):
+from scripts._sqlite_utils import open_tuned, close_tuned, load_cached_analysis, save_cached_analysis
+
+def analyze_doi_duplicates(db_path: str) -> Dict:
     """
-    Check for duplicate DOIs in the database and provide detailed analysis
+    Run the duplicate-DOI queries and return the results as plain data
     
     Args:
         db_path: Path to the SQLite database
+        
+    Returns:
+        Dict with total_papers, papers_with_doi, duplicates [(doi, count)] and
+        records_by_doi {doi: [record dict, ...]}
     """
-    conn = sqlite3.connect(db_path)
+    conn = open_tuned(db_path)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
+    # One read snapshot for every query below instead of an implicit one per statement
+    cursor.execute("BEGIN")
     
-    print("="*80)
-    print("DOI DUPLICATE ANALYSIS")
-    print("="*80)
-    print(f"Database: {db_path}\n")
-    
-    # Get total paper count
-    cursor.execute("SELECT COUNT(*) FROM papers")
-    total_papers = cursor.fetchone()[0]
-    print(f"Total papers in database: {total_papers:,}")
-    
-    # Count papers with DOIs
-    cursor.execute("SELECT COUNT(*) FROM papers WHERE doi IS NOT NULL AND doi != ''")
-    papers_with_doi = cursor.fetchone()[0]
-    print(f"Papers with DOI: {papers_with_doi:,}")
-    print(f"Papers without DOI: {total_papers - papers_with_doi:,}\n")
+    # Get total paper count and papers with DOIs in a single scan
+    cursor.execute("""
+        SELECT COUNT(*), COALESCE(SUM(doi IS NOT NULL AND doi != ''), 0)
+        FROM papers
+    """)
+    total_papers, papers_with_doi = cursor.fetchone()
     
-    # Find duplicate DOIs
+    # Find duplicate DOIs (plain tuples: no per-row Row objects for the bulk scan)
+    cursor.row_factory = None
     cursor.execute("""
         SELECT doi, COUNT(*) as count
         FROM papers
@@ -48,15 +50,76 @@ def check_doi_duplicates(db_path: str):
     """)
     
     duplicates = cursor.fetchall()
+    cursor.row_factory = sqlite3.Row
+    
+    records_by_doi = {}
+    if duplicates:
+        # Get all papers in every duplicate group with one query instead of one per DOI
+        cursor.execute("""
+            SELECT pmid, pmcid, doi, title, year, journal, 
+                   is_full_text_pmc, collection_date, query_id
+            FROM papers
+            WHERE doi IN (
+                SELECT doi FROM papers
+                WHERE doi IS NOT NULL AND doi != ''
+                GROUP BY doi
+                HAVING COUNT(*) > 1
+            )
+            ORDER BY doi, collection_date, pmid
+        """)
+        records_by_doi = {
+            doi: [dict(r) for r in group]
+            for doi, group in groupby(cursor.fetchall(), key=lambda r: r['doi'])
+        }
+    
+    conn.commit()
+    close_tuned(conn)
+    
+    return {
+        'total_papers': total_papers,
+        'papers_with_doi': papers_with_doi,
+        'duplicates': duplicates,
+        'records_by_doi': records_by_doi,
+    }
+
+
+def check_doi_duplicates(db_path: str, use_cache: bool = True):
+    """
+    Check for duplicate DOIs in the database and provide detailed analysis
+    
+    Args:
+        db_path: Path to the SQLite database
+        use_cache: Reuse the last analysis if the database file is unchanged
+    """
+    print("="*80)
+    print("DOI DUPLICATE ANALYSIS")
+    print("="*80)
+    print(f"Database: {db_path}\n")
+    
+    analysis = load_cached_analysis(db_path, 'doi_duplicates') if use_cache else None
+    if analysis is not None:
+        print("(Database unchanged since last run - using cached analysis)\n")
+    else:
+        analysis = analyze_doi_duplicates(db_path)
+        if use_cache:
+            save_cached_analysis(db_path, 'doi_duplicates', analysis)
+    
+    total_papers = analysis['total_papers']
+    papers_with_doi = analysis['papers_with_doi']
+    duplicates = analysis['duplicates']
+    records_by_doi = analysis['records_by_doi']
+    
+    print(f"Total papers in database: {total_papers:,}")
+    print(f"Papers with DOI: {papers_with_doi:,}")
+    print(f"Papers without DOI: {total_papers - papers_with_doi:,}\n")
     
     if not duplicates:
         print("✅ No DOI duplicates found!")
         print("All DOIs are unique in the database.")
-        conn.close()
         return
     
     print(f"⚠️  Found {len(duplicates)} duplicate DOIs")
-    print(f"Total duplicate entries: {sum(d['count'] for d in duplicates)}\n")
+    print(f"Total duplicate entries: {sum(count for _, count in duplicates)}\n")
     
     print("-"*80)
     print("DUPLICATE DOI DETAILS")
@@ -64,20 +127,8 @@ def check_doi_duplicates(db_path: str):
     
     all_duplicate_records = []
     
-    for dup in duplicates:
-        doi = dup['doi']
-        count = dup['count']
-        
-        # Get all papers with this DOI
-        cursor.execute("""
-            SELECT pmid, pmcid, doi, title, year, journal, 
-                   is_full_text_pmc, collection_date, query_id
-            FROM papers
-            WHERE doi = ?
-            ORDER BY collection_date, pmid
-        """, (doi,))
-        
-        records = cursor.fetchall()
+    for doi, count in duplicates:
+        records = records_by_doi.get(doi, [])
         all_duplicate_records.extend(records)
         
         print(f"\n🔍 DOI: {doi}")
@@ -87,9 +138,11 @@ def check_doi_duplicates(db_path: str):
         for i, record in enumerate(records, 1):
             print(f"      [{i}] PMID: {record['pmid']}")
             print(f"          PMCID: {record['pmcid'] or 'N/A'}")
-            print(f"          Title: {record['title'][:70]}..." if len(record['title']) > 70 else f"          Title: {record['title']}")
+            title = record['title'] or ""
+            journal = record['journal'] or "N/A"
+            print("          Title: %.70s%s" % (title, "..." if len(title) > 70 else ""))
             print(f"          Year: {record['year'] or 'N/A'}")
-            print(f"          Journal: {record['journal'][:50]}..." if record['journal'] and len(record['journal']) > 50 else f"          Journal: {record['journal'] or 'N/A'}")
+            print("          Journal: %.50s%s" % (journal, "..." if len(journal) > 50 else ""))
             print(f"          Full text: {'Yes' if record['is_full_text_pmc'] else 'No'}")
             print(f"          Collection date: {record['collection_date']}")
             print(f"          Query ID: {record['query_id'] or 'N/A'}")
@@ -162,8 +215,6 @@ Note: The current schema uses PMID as PRIMARY KEY, which allows
 duplicate DOIs if papers have different PMIDs. Consider modifying
 the database schema to enforce DOI uniqueness or use composite keys.
 """)
-    
-    conn.close()
 
 
 if __name__ == "__main__":
@@ -173,12 +224,14 @@ if __name__ == "__main__":
         'paper_collection', 'data', 'papers.db'
     )
     
-    # Allow custom path as argument
-    if len(sys.argv) > 1:
-        db_path = sys.argv[1]
+    # Allow custom path as argument; --no-cache forces a fresh analysis
+    args = [arg for arg in sys.argv[1:] if arg != '--no-cache']
+    use_cache = '--no-cache' not in sys.argv[1:]
+    if args:
+        db_path = args[0]
     
     if not os.path.exists(db_path):
         print(f"❌ Error: Database not found at {db_path}")
         sys.exit(1)
     
-    check_doi_duplicates(db_path)
+    check_doi_duplicates(db_path, use_cache=use_cache)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Create the secondary indexes the maintenance scripts rely on
+"""
+import sys
+import os
+import sqlite3
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts._sqlite_utils import open_tuned, close_tuned
+
+
+# Columns the scripts filter and group on; without these every lookup is a full scan
+PAPER_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_papers_doi ON papers(doi)",
+    "CREATE INDEX IF NOT EXISTS idx_papers_query_id ON papers(query_id)",
+    "DROP INDEX IF EXISTS idx_papers_fulltext_doi",  # Superseded by the covering index below
+    "CREATE INDEX IF NOT EXISTS idx_papers_fulltext_export ON papers(is_full_text_pmc, doi, pmid, title)",
+    "CREATE INDEX IF NOT EXISTS idx_papers_year ON papers(year)",
+    "CREATE INDEX IF NOT EXISTS idx_papers_journal ON papers(journal)",
+)
+
+
+def ensure_indexes(conn: sqlite3.Connection):
+    """
+    Create the paper indexes if missing and refresh the query planner statistics.
+    
+    Args:
+        conn: Open SQLite connection to a papers database
+    """
+    for statement in PAPER_INDEXES:
+        conn.execute(statement)
+    conn.commit()
+    # Re-analyze tables whose indexes changed so the planner actually uses them
+    conn.execute("PRAGMA optimize")
+
+
+def main(db_path: str):
+    conn = open_tuned(db_path)
+    
+    before = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    ensure_indexes(conn)
+    after = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    
+    created = sorted(after - before)
+    if created:
+        print(f"✅ Created {len(created)} index(es): {', '.join(created)}")
+    else:
+        print("✅ All indexes already exist")
+    
+    close_tuned(conn)
+
+
+if __name__ == "__main__":
+    # Default database path
+    db_path = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        'paper_collection', 'data', 'papers.db'
+    )
+    
+    # Allow custom path as argument
+    if len(sys.argv) > 1:
+        db_path = sys.argv[1]
+    
+    if not os.path.exists(db_path):
+        print(f"❌ Error: Database not found at {db_path}")
+        sys.exit(1)
+    
+    main(db_path)
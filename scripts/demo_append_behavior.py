@@ -19,10 +19,9 @@ before_count = db.get_statistics()['total_papers']
 print(f"\nBEFORE collection:")
 print(f"  Papers in database: {before_count:,}")
 
-# Get some sample PMIDs
+# Get some sample PMIDs (fetched once, reused for the timing test below)
+sample_pmids = list(db.iter_pmids(limit=100))
 if before_count > 0:
-    papers = db.get_all_papers()
-    sample_pmids = [p.pmid for p in papers[:5]]
     print(f"  Sample PMIDs: {sample_pmids[:3]}")
 else:
     print(f"  Database is empty")
@@ -54,18 +53,17 @@ print("-"*80)
 
 import time
 if before_count > 0:
-    # Test how fast paper_exists() is
-    test_pmids = [p.pmid for p in db.get_all_papers()[:100]]
+    # Test how fast the bulk papers_exist() check used by process_batch is
+    test_pmids = sample_pmids
     
     start = time.time()
-    for pmid in test_pmids:
-        exists = db.paper_exists(pmid)
+    existing = db.papers_exist(test_pmids)
     elapsed = time.time() - start
     
     print(f"Checked {len(test_pmids)} PMIDs in {elapsed:.3f} seconds")
     print(f"Average: {elapsed/len(test_pmids)*1000:.2f} ms per PMID")
     print(f"For 46,351 PMIDs: ~{(elapsed/len(test_pmids))*46351:.1f} seconds (~{(elapsed/len(test_pmids))*46351/60:.1f} minutes)")
-    print("✅ Very fast! Uses indexed PRIMARY KEY lookup")
+    print("✅ Very fast! One indexed PRIMARY KEY IN (...) lookup per batch")
 
 db.close()
 
@@ -5,11 +5,13 @@ Searches ALL Europe PMC content: published papers + preprints
 """
 import sys
 import time
+import atexit
 import traceback
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from tqdm import tqdm
-from typing import List, Tuple, Optional
+from typing import Iterable, Iterator, List, Tuple, Optional
 
 from src.models import PaperMetadata, CollectionStats
 from src.europepmc_extractor import (
@@ -21,7 +23,57 @@ from src.database import PaperDatabase
 from src.config import NUM_THREADS, BATCH_SIZE, CHECKPOINT_EVERY
 
 
-def process_batch(paper_batch: List[dict], db: PaperDatabase, query_id: int = None, skip_existing: bool = True) -> Tuple[int, int, int, int, int, int]:
+# Worker pools shared by every process_batch call, so threads are created once per run
+_FT_POOL = None
+_OA_POOL = None
+
+
+def _shutdown_worker_pools():
+    """Shut down the shared full-text and OpenAlex pools, if started"""
+    for pool in (_FT_POOL, _OA_POOL):
+        if pool is not None:
+            pool.shutdown()
+
+
+def _start_worker_pools(concurrent_batches: int = 1):
+    """
+    (Re)create the shared pools for the number of batches running at once.
+    
+    Each batch gets the previous per-batch limits (2 full-text and 3 OpenAlex
+    workers), so total concurrency against the rate-limited APIs is unchanged
+    in both threaded and single-threaded runs.
+    """
+    global _FT_POOL, _OA_POOL
+    _shutdown_worker_pools()
+    _FT_POOL = ThreadPoolExecutor(max_workers=2 * concurrent_batches, thread_name_prefix='fulltext')
+    _OA_POOL = ThreadPoolExecutor(max_workers=3 * concurrent_batches, thread_name_prefix='openalex')
+
+
+_start_worker_pools()
+atexit.register(_shutdown_worker_pools)
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    """Lazily yield lists of up to `size` consecutive items"""
+    it = iter(items)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def fetch_fulltext_for_paper(metadata):
+    """Helper to fetch full text for a single paper"""
+    # Only try for papers with PMCIDs (published papers)
+    if metadata.pmcid:
+        full_text, sections = try_all_fulltext_sources(metadata)
+        if full_text:
+            metadata.full_text = full_text
+            metadata.full_text_sections = sections
+            metadata.is_full_text_pmc = True
+    return metadata
+
+
+def process_batch(paper_batch: List[dict], db: PaperDatabase, query_id: int = None, skip_existing: bool = True,
+                  known_identifiers: set = None) -> Tuple[int, int, int, int, int, int]:
     """
     Process a batch of papers from Europe PMC.
     
@@ -30,6 +82,9 @@ def process_batch(paper_batch: List[dict], db: PaperDatabase, query_id: int = No
         db: Database handler
         query_id: Query ID to assign to papers
         skip_existing: If True, skip ALL existing papers (no enrichment)
+        known_identifiers: Optional in-memory set of PMIDs/DOIs already in the
+            database, used instead of querying it when skip_existing is True;
+            identifiers of papers saved by this batch are added to it
         
     Returns:
         Tuple of (processed, with_fulltext, with_openalex, failed, skipped, enriched)
@@ -45,30 +100,55 @@ def process_batch(paper_batch: List[dict], db: PaperDatabase, query_id: int = No
     papers_to_process = []
     papers_to_enrich = []
     
-    for paper in paper_batch:
-        pmid = paper.get('pmid')
-        doi = paper.get('doi')
-        identifier = pmid or doi
-        
-        if not identifier:
-            continue
-        
-        # Check if paper needs enrichment
-        needs_enrichment, existing_paper = db.paper_needs_enrichment(identifier)
-        
-        if existing_paper is None:
-            # Paper doesn't exist - add to new papers list
-            papers_to_process.append(paper)
-        elif needs_enrichment and not skip_existing:
-            # Paper exists but needs enrichment (only if enrichment is enabled)
-            metadata = extract_europepmc_metadata(paper)
-            if metadata:
-                # Merge with existing data (keep existing query_id, etc.)
-                metadata.query_id = existing_paper.query_id
-                papers_to_enrich.append(metadata)
+    identifiers = [paper.get('pmid') or paper.get('doi') for paper in paper_batch]
+    
+    # Re-runs mostly fetch known papers: if nothing is new and enrichment is off,
+    # one key-only existence query decides the whole batch
+    if skip_existing:
+        if known_identifiers is not None:
+            existing = known_identifiers
         else:
-            # Paper exists - skip (either complete OR skip_existing=True)
-            skipped += 1
+            existing = db.identifiers_exist(identifiers)
+        if all(identifier in existing for identifier in identifiers if identifier):
+            skipped = sum(1 for identifier in identifiers if identifier)
+            return processed, with_fulltext, with_openalex, failed, skipped, enriched
+    
+    if skip_existing:
+        # Existing papers are skipped outright: no full-row loads and no
+        # metadata extraction for results that would be thrown away
+        for paper, identifier in zip(paper_batch, identifiers):
+            if not identifier:
+                continue
+            if identifier in existing:
+                skipped += 1
+            else:
+                papers_to_process.append(paper)
+    else:
+        # Key-only existence check, then full rows only for papers missing content
+        existing = db.identifiers_exist(identifiers)
+        papers_needing_enrichment = db.get_papers_needing_enrichment(
+            [identifier for identifier in identifiers if identifier in existing]
+        )
+        
+        for paper, identifier in zip(paper_batch, identifiers):
+            if not identifier:
+                continue
+            
+            existing_paper = papers_needing_enrichment.get(identifier)
+            
+            if identifier not in existing:
+                # Paper doesn't exist - add to new papers list
+                papers_to_process.append(paper)
+            elif existing_paper is not None:
+                # Paper exists but needs enrichment
+                metadata = extract_europepmc_metadata(paper)
+                if metadata:
+                    # Merge with existing data (keep existing query_id, etc.)
+                    metadata.query_id = existing_paper.query_id
+                    papers_to_enrich.append(metadata)
+            else:
+                # Paper exists and is complete - skip
+                skipped += 1
     
     if not papers_to_process and not papers_to_enrich:
         return processed, with_fulltext, with_openalex, failed, skipped, enriched
@@ -82,101 +162,85 @@ def process_batch(paper_batch: List[dict], db: PaperDatabase, query_id: int = No
         else:
             failed += 1
     
-    # Try to get full text for papers with PMCIDs (using existing PubMed infrastructure)
-    from concurrent.futures import ThreadPoolExecutor as FullTextExecutor
-    
-    def fetch_fulltext_for_paper(metadata):
-        """Helper to fetch full text for a single paper"""
-        # Only try for papers with PMCIDs (published papers)
+    # Split papers in one pass: PMCID -> full text fetch, DOI -> OpenAlex enrichment
+    papers_with_pmcid = []
+    papers_with_doi = []
+    for metadata in all_metadata:
         if metadata.pmcid:
-            full_text, sections = try_all_fulltext_sources(metadata)
-            if full_text:
-                metadata.full_text = full_text
-                metadata.full_text_sections = sections
-                metadata.is_full_text_pmc = True
-        return metadata
+            papers_with_pmcid.append(metadata)
+        if metadata.doi:
+            papers_with_doi.append(metadata)
     
+    # Try to get full text for papers with PMCIDs (using existing PubMed infrastructure)
     # Parallel full text fetching for papers with PMCIDs
-    papers_with_pmcid = [m for m in all_metadata if m.pmcid]
-    
     if papers_with_pmcid:
-        with FullTextExecutor(max_workers=min(2, len(papers_with_pmcid))) as ft_executor:
-            futures = {ft_executor.submit(fetch_fulltext_for_paper, paper): paper 
-                      for paper in papers_with_pmcid}
-            for future in futures:
-                try:
-                    future.result()  # Updates metadata in place
-                except Exception as e:
-                    print(f"Error fetching full text: {e}")
+        futures = {_FT_POOL.submit(fetch_fulltext_for_paper, paper): paper 
+                  for paper in papers_with_pmcid}
+        for future in as_completed(futures):
+            try:
+                future.result()  # Updates metadata in place
+            except Exception as e:
+                print(f"Error fetching full text: {e}")
     
     # Assign query_id
     if query_id is not None:
         for metadata in all_metadata:
-            if metadata:
-                metadata.query_id = query_id
+            metadata.query_id = query_id
     
     # Parallelize OpenAlex enrichment
-    papers_with_doi = [m for m in all_metadata if m and m.doi]
-    
     if papers_with_doi:
-        with FullTextExecutor(max_workers=min(3, len(papers_with_doi))) as oa_executor:
-            futures = {oa_executor.submit(enrich_with_openalex, paper): paper 
-                      for paper in papers_with_doi}
-            enriched_papers = []
-            for future in futures:
-                try:
-                    enriched_papers.append(future.result())
-                except Exception as e:
-                    print(f"Error enriching with OpenAlex: {e}")
-                    enriched_papers.append(futures[future])
-    else:
-        enriched_papers = []
-    
-    # Add papers without DOIs
-    papers_without_doi = [m for m in all_metadata if m and not m.doi]
-    all_papers_final = enriched_papers + papers_without_doi
+        futures = {_OA_POOL.submit(enrich_with_openalex, paper): paper 
+                  for paper in papers_with_doi}
+        for future in as_completed(futures):
+            try:
+                future.result()  # Updates metadata in place
+            except Exception as e:
+                print(f"Error enriching with OpenAlex: {e}")
     
     # Enrich existing papers that are missing abstract or full text
     if papers_to_enrich:
         print(f"  📝 Enriching {len(papers_to_enrich)} existing papers...")
-        with FullTextExecutor(max_workers=2) as ft_executor:
-            futures = {ft_executor.submit(fetch_fulltext_for_paper, paper): paper 
-                      for paper in papers_to_enrich}
-            for future in futures:
-                try:
-                    enriched_paper = future.result()
-                    # Update in database
-                    if db.insert_paper(enriched_paper):  # INSERT OR REPLACE
-                        enriched += 1
-                        print(f"  ✓ Enriched {enriched_paper.pmid or enriched_paper.doi}")
-                except Exception as e:
-                    print(f"  ✗ Error enriching: {e}")
-    
-    # Save to database
-    for metadata in all_papers_final:
-        if metadata is None:
-            failed += 1
-            continue
-        
-        openalex_success = metadata.openalex_retrieved if hasattr(metadata, 'openalex_retrieved') else False
-        
-        if db.insert_paper(metadata):
-            processed += 1
-            if metadata.is_full_text_pmc:
-                with_fulltext += 1
-            if openalex_success:
-                with_openalex += 1
-            
-            # Track papers without full text
-            if not metadata.is_full_text_pmc and metadata.doi:
-                db.add_failed_doi(
-                    metadata.doi,
-                    metadata.pmid,
-                    "No full text available",
-                    datetime.now().isoformat()
-                )
-        else:
-            failed += 1
+        futures = {_FT_POOL.submit(fetch_fulltext_for_paper, paper): paper 
+                  for paper in papers_to_enrich}
+        enriched_papers_to_save = []
+        for future in as_completed(futures):
+            try:
+                enriched_papers_to_save.append(future.result())
+            except Exception as e:
+                print(f"  ✗ Error enriching: {e}")
+        # Update all enriched papers in the database in one transaction;
+        # only the papers actually saved are reported as enriched
+        saved_enriched = db.insert_papers_batch(enriched_papers_to_save)
+        enriched += len(saved_enriched)
+        for enriched_paper in saved_enriched:
+            print(f"  ✓ Enriched {enriched_paper.pmid or enriched_paper.doi}")
+    
+    # Track papers without full text
+    timestamp = datetime.now().isoformat()
+    failed_dois = [
+        (metadata.doi, metadata.pmid, "No full text available", timestamp)
+        for metadata in all_metadata
+        if not metadata.is_full_text_pmc and metadata.doi
+    ]
+    
+    # Save papers and failed DOIs in a single transaction
+    # (all_metadata was updated in place by the fetches above); only the
+    # papers actually saved are counted below
+    saved = db.insert_papers_batch(all_metadata, failed_dois=failed_dois)
+    processed += len(saved)
+    failed += len(all_metadata) - len(saved)
+    for metadata in saved:
+        if metadata.is_full_text_pmc:
+            with_fulltext += 1
+        if getattr(metadata, 'openalex_retrieved', False):
+            with_openalex += 1
+    
+    # Only saved papers are known to be stored; the rest are re-checked by later batches
+    if known_identifiers is not None:
+        known_identifiers.update(
+            identifier for metadata in saved
+            for identifier in (metadata.pmid, metadata.doi) if identifier
+        )
     
     return processed, with_fulltext, with_openalex, failed, skipped, enriched
 
@@ -263,14 +327,34 @@ def collect_europepmc_papers(query: str,
     start_time = time.time()
     total_skipped = 0
     
-    if use_threading:
-        # Multi-threaded processing
-        batches = [paper_list[i:i+BATCH_SIZE] for i in range(0, len(paper_list), BATCH_SIZE)]
-        
-        with ThreadPoolExecutor(max_workers=NUM_THREADS) as executor:
-            futures = {executor.submit(process_batch, batch, db, query_id, skip_existing): batch for batch in batches}
+    # One scan of the stored identifiers up front; batches then check membership
+    # in memory instead of querying the database for every batch
+    known_identifiers = db.get_identifier_set() if skip_existing else None
+    
+    # Batches are sliced lazily as they are submitted
+    batches = batched(paper_list, BATCH_SIZE)
+    num_batches = (len(paper_list) + BATCH_SIZE - 1) // BATCH_SIZE
+    
+    # One code path for both modes: single-threaded is just a one-worker pool
+    workers = NUM_THREADS if use_threading else 1
+    _start_worker_pools(workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor, \
+            tqdm(total=num_batches, desc="Processing batches") as progress:
+        futures = {}
+        completed = 0
+        while True:
+            # Keep at most two batches per worker in flight, slicing the next
+            # ones only as earlier batches finish
+            for batch in islice(batches, 2 * workers - len(futures)):
+                futures[executor.submit(process_batch, batch, db, query_id, skip_existing, known_identifiers)] = batch
+            if not futures:
+                break
             
-            for i, future in enumerate(tqdm(as_completed(futures), total=len(futures), desc="Processing batches")):
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = futures.pop(future)
+                completed += 1
+                progress.update(1)
                 try:
                     processed, with_fulltext, with_openalex, failed, skipped, enriched = future.result()
                     stats.total_processed += processed
@@ -284,32 +368,14 @@ def collect_europepmc_papers(query: str,
                     print(f"\nBatch failed with exception: {exc}")
                     print(f"Full traceback:", file=sys.stderr)
                     traceback.print_exc(file=sys.stderr)
-                    stats.failed_pubmed += len(futures[future])
+                    stats.failed_pubmed += len(batch)
                 
                 # Checkpoint
-                if (i + 1) % CHECKPOINT_EVERY == 0 or (i + 1) == len(futures):
-                    print(f"\n[Checkpoint {i+1}/{len(futures)}] Processed: {stats.total_processed}, "
+                if completed % CHECKPOINT_EVERY == 0 or completed == num_batches:
+                    print(f"\n[Checkpoint {completed}/{num_batches}] Processed: {stats.total_processed}, "
                           f"With full text: {stats.with_full_text}, "
                           f"With OpenAlex: {stats.with_openalex}, "
                           f"Skipped (already in DB): {total_skipped}")
-    else:
-        # Single-threaded processing
-        batches = [paper_list[i:i+BATCH_SIZE] for i in range(0, len(paper_list), BATCH_SIZE)]
-        
-        for batch in tqdm(batches, desc="Processing batches"):
-            try:
-                processed, with_fulltext, with_openalex, failed, skipped, enriched = process_batch(batch, db, query_id, skip_existing)
-                stats.total_processed += processed
-                stats.with_full_text += with_fulltext
-                stats.with_openalex += with_openalex
-                stats.failed_pubmed += failed
-                total_skipped += skipped
-                # Note: enriched papers are included in total_processed
-            except Exception as exc:
-                print(f"\nBatch failed with exception: {exc}")
-                print(f"Full traceback:", file=sys.stderr)
-                traceback.print_exc(file=sys.stderr)
-                stats.failed_pubmed += len(batch)
     
     elapsed = time.time() - start_time
     stats.end_time = datetime.now().isoformat()
@@ -335,12 +401,8 @@ def collect_europepmc_papers(query: str,
     print(f"  - Papers without full text: {failed_path}")
     print(f"  - Database: {db.db_path}")
     
-    # Database statistics
-    db_stats = db.get_statistics()
-    print("\nDatabase statistics:")
-    for key, value in db_stats.items():
-        print(f"  - {key}: {value}")
-    
+    # The run totals above were tallied during processing; no table-wide
+    # aggregate scan is needed to report them (db.get_statistics() has DB totals)
     db.close()
     print("\n" + "="*60)
     print("Collection completed successfully!")
@@ -1,11 +1,15 @@
 import os
 import sys
 import time
+import threading
 import requests
 import csv
 import sys
 from pathlib import Path
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 if str(PROJECT_ROOT) not in sys.path:
@@ -13,16 +17,46 @@ if str(PROJECT_ROOT) not in sys.path:
         
 # Import your paper_names list
 from data.dois_validation.dois_validation import paper_names
+from src.config import OPENALEX_EMAIL
+
+# One keep-alive session for all CrossRef lookups (no TCP/TLS handshake per title).
+# Transient errors and 429s are retried with backoff; the mailto in the
+# User-Agent routes requests to CrossRef's polite pool.
+session = requests.Session()
+session.mount('https://', HTTPAdapter(
+    pool_connections=4, pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+))
+session.headers['User-Agent'] = f"doi-lookup/1.0 (mailto:{OPENALEX_EMAIL})"
+
+# Concurrent lookups overlap request latency; the shared throttle keeps the
+# combined request rate under CrossRef's polite-pool limit
+MAX_WORKERS = 8
+MIN_REQUEST_INTERVAL = 0.1  # seconds between request starts (10 req/s overall)
+_throttle_lock = threading.Lock()
+_next_request_time = 0.0
+
+
+def _wait_for_request_slot():
+    """Thread-safe throttle: reserve the next request start time and sleep until it."""
+    global _next_request_time
+    with _throttle_lock:
+        now = time.monotonic()
+        start = max(now, _next_request_time)
+        _next_request_time = start + MIN_REQUEST_INTERVAL
+    time.sleep(start - now)
+
 
 def get_doi_from_title(title):
     """Query the CrossRef API for a DOI using the title."""
+    _wait_for_request_slot()
     url = 'https://api.crossref.org/works'
     params = {
         'query.bibliographic': title,
         'rows': 1
     }
     try:
-        resp = requests.get(url, params=params, timeout=10)
+        resp = session.get(url, params=params, timeout=10)
         resp.raise_for_status()
         data = resp.json()
         items = data['message']['items']
@@ -33,25 +67,22 @@ def get_doi_from_title(title):
         print(f"Error with title '{title}': {e}")
         return None
 
-results = []
+print(f"Querying CrossRef for {len(paper_names)} titles ({MAX_WORKERS} parallel workers)...")
+with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+    # map() keeps results in input order
+    results = list(zip(paper_names, executor.map(get_doi_from_title, paper_names)))
 
-for title in paper_names:
-    print(f"Querying: {title[:80]}...")
-    doi = get_doi_from_title(title)
-    results.append((title, doi))
-    print(f" -> DOI: {doi}")
-    time.sleep(1)  # Be polite to the API.
+for title, doi in results:
+    print(f"{title[:80]}... -> DOI: {doi}")
 
-# Save as a txt file (tab-separated)
+# Save as a txt file (tab-separated; csv quotes titles containing tabs or quotes)
 output_file = "data/dois_validation/dois_validation_2.txt"
-with open(output_file, 'w', encoding='utf-8') as f:
-    for title, doi in results:
-        f.write(f"{title}:{doi}\n")
+with open(output_file, 'w', newline='', encoding='utf-8') as f:
+    csv.writer(f, delimiter='\t', lineterminator='\n').writerows(results)
 
-# Save as a txt file (tab-separated)
+# Save the DOIs that were found, one per line
 output_file = "data/dois_validation/dois_validation_2_only_DOIS.txt"
 with open(output_file, 'w', encoding='utf-8') as f:
-    for title, doi in results:
-        f.write(f"{doi}\n")
+    f.writelines(f"{doi}\n" for _, doi in results if doi)
 
-print(f"\nDONE! Results saved as '{output_file}'.")
\ No newline at end of file
+print(f"\nDONE! Results saved as '{output_file}'.")
@@ -5,17 +5,47 @@ Useful if you already collected papers and want to apply text cleaning
 """
 import sys
 import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from itertools import islice
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
 
 from src.database import PaperDatabase
 from src.text_cleaner import clean_text_comprehensive, clean_abstract
 from tqdm import tqdm
 
+# Papers are read, cleaned and written back in batches of this size (one transaction each)
+UPDATE_BATCH_SIZE = 1000
+
+
+def _clean_one(row: tuple) -> tuple:
+    """
+    Clean one paper's texts (runs in a worker process, so it must be module-level).
+    
+    Args:
+        row: (pmid, abstract, full_text)
+        
+    Returns:
+        (pmid, abstract, full_text, modified) with the cleaned texts
+    """
+    pmid, abstract, full_text = row
+    cleaned_abstract = clean_abstract(abstract) if abstract else abstract
+    cleaned_fulltext = clean_text_comprehensive(full_text, remove_references=True) if full_text else full_text
+    modified = cleaned_abstract != abstract or cleaned_fulltext != full_text
+    return pmid, cleaned_abstract, cleaned_fulltext, modified
+
 
 def reclean_all_papers(db_path: str = None):
     """
     Re-clean all papers in the database.
     
+    Papers are read from SQLite in rowid-paged batches; each batch is cleaned in
+    parallel worker processes (the regex cleaning is CPU-bound) and its
+    modified texts are written back in one transaction.
+    
     Args:
         db_path: Path to database file (uses default if None)
     """
@@ -25,17 +55,16 @@ def reclean_all_papers(db_path: str = None):
     else:
         db = PaperDatabase()
     
-    # Get all papers
-    papers = db.get_all_papers()
-    print(f"Found {len(papers)} papers in database")
+    total_papers = db.get_statistics()['total_papers']
+    print(f"Found {total_papers} papers in database")
     
-    if not papers:
+    if not total_papers:
         print("No papers to clean!")
         db.close()
         return
     
     # Ask for confirmation
-    response = input(f"\nThis will re-clean {len(papers)} papers. Continue? (y/n): ")
+    response = input(f"\nThis will re-clean {total_papers} papers. Continue? (y/n): ")
     if response.lower() != 'y':
         print("Cancelled.")
         db.close()
@@ -44,32 +73,25 @@ def reclean_all_papers(db_path: str = None):
     print("\nRe-cleaning papers...")
     cleaned_count = 0
     
-    for paper in tqdm(papers, desc="Cleaning papers"):
-        modified = False
-        
-        # Clean abstract
-        if paper.abstract:
-            cleaned_abstract = clean_abstract(paper.abstract)
-            if cleaned_abstract != paper.abstract:
-                paper.abstract = cleaned_abstract
-                modified = True
-        
-        # Clean full text
-        if paper.full_text:
-            cleaned_fulltext = clean_text_comprehensive(paper.full_text, remove_references=True)
-            if cleaned_fulltext != paper.full_text:
-                paper.full_text = cleaned_fulltext
-                modified = True
-        
-        # Update in database if modified
-        if modified:
-            db.insert_paper(paper)
-            cleaned_count += 1
+    # Each batch is a short read of its own, so no read transaction stays open
+    # across the writes (an open reader would keep the WAL from being reset)
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor, \
+            tqdm(total=total_papers, desc="Cleaning papers") as progress:
+        for rows in db.iter_paper_text_batches(UPDATE_BATCH_SIZE):
+            # Queue modified papers; one commit per batch
+            pending_updates = []  # (abstract, full_text, pmid) rows
+            for pmid, abstract, full_text, modified in executor.map(_clean_one, rows, chunksize=64):
+                if modified:
+                    pending_updates.append((abstract, full_text, pmid))
+            db.update_paper_texts(pending_updates)
+            
+            cleaned_count += len(pending_updates)
+            progress.update(len(rows))
     
     print(f"\nCleaning completed!")
-    print(f"  - Total papers: {len(papers)}")
+    print(f"  - Total papers: {total_papers}")
     print(f"  - Papers modified: {cleaned_count}")
-    print(f"  - Papers unchanged: {len(papers) - cleaned_count}")
+    print(f"  - Papers unchanged: {total_papers - cleaned_count}")
     
     # Export cleaned data
     print("\nExporting cleaned data...")
@@ -93,8 +115,8 @@ def preview_cleaning_effect(db_path: str = None, num_samples: int = 3):
     else:
         db = PaperDatabase()
     
-    # Get papers with full text
-    papers = db.get_papers_with_fulltext()[:num_samples]
+    # Get the first few papers with full text (stops reading after num_samples)
+    papers = list(islice(db.iter_papers_with_fulltext(), num_samples))
     
     if not papers:
         print("No papers with full text found!")
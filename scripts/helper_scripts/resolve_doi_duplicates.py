@@ -7,108 +7,202 @@ import os
 import sqlite3
 import json
 from datetime import datetime
-from typing import List, Dict
+from itertools import groupby
+from typing import List, Iterable, Iterator, Tuple
 import argparse
 
-# Add parent directory to path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
+from scripts._sqlite_utils import open_tuned, close_tuned, immediate_transaction
 
-def get_duplicate_dois(cursor) -> List[tuple]:
-    """Get list of duplicate DOIs"""
-    cursor.execute("""
-        SELECT doi, COUNT(*) as count
-        FROM papers
-        WHERE doi IS NOT NULL AND doi != ''
-        GROUP BY doi
-        HAVING COUNT(*) > 1
-        ORDER BY count DESC
-    """)
+# Max PMIDs bound per DELETE ... IN (...) statement (below SQLite's 999-variable limit)
+DELETE_CHUNK_SIZE = 900
+
+
+def ensure_doi_index(conn):
+    """
+    Create the DOI index the duplicate scans rely on, if it is missing
+    
+    papers.db files created before PaperDatabase added idx_papers_doi would
+    otherwise make GROUP BY doi and the DOI join full-table scans with a temp sort.
+    """
+    with immediate_transaction(conn):
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_papers_doi ON papers(doi)")
+
+
+def delete_pmids(cursor, pmids: List[str]):
+    """Delete papers by PMID, one DELETE ... IN (...) statement per chunk"""
+    for i in range(0, len(pmids), DELETE_CHUNK_SIZE):
+        chunk = pmids[i:i + DELETE_CHUNK_SIZE]
+        placeholders = ','.join('?' * len(chunk))
+        cursor.execute(f"DELETE FROM papers WHERE pmid IN ({placeholders})", chunk)
+
+
+DUPLICATE_GROUPS_SQL = """
+    SELECT doi, COUNT(*) as count
+    FROM papers
+    WHERE doi IS NOT NULL AND doi != ''
+    GROUP BY doi
+    HAVING COUNT(*) > 1
+"""
+
+# Rows are ordered by group size (largest first), then DOI, then most recent
+# collection first, so consecutive rows form one duplicate group
+DUPLICATE_PAPERS_SQL = f"""
+    SELECT {{columns}} FROM papers p
+    JOIN ({DUPLICATE_GROUPS_SQL}) d ON p.doi = d.doi
+    ORDER BY d.count DESC, p.doi, p.collection_date DESC, p.pmid
+"""
+
+
+# Columns the keep-* strategies read; they never need the text or list fields
+KEY_COLUMNS = "p.pmid, p.doi, p.collection_date, p.is_full_text_pmc"
+
+
+def get_all_duplicate_papers(cursor, columns: str = "p.*") -> List[sqlite3.Row]:
+    """Get every paper whose DOI is shared with another paper, in one query"""
+    cursor.execute(DUPLICATE_PAPERS_SQL.format(columns=columns))
     return cursor.fetchall()
 
 
-def get_papers_by_doi(cursor, doi: str) -> List[Dict]:
-    """Get all papers with a specific DOI"""
-    cursor.execute("""
-        SELECT * FROM papers WHERE doi = ?
-        ORDER BY collection_date DESC, pmid
-    """, (doi,))
-    return [dict(row) for row in cursor.fetchall()]
+def group_by_doi(rows: Iterable[sqlite3.Row]) -> Iterator[Tuple[str, List[sqlite3.Row]]]:
+    """Yield (doi, rows) for each duplicate group in rows ordered as DUPLICATE_PAPERS_SQL"""
+    for doi, group in groupby(rows, key=lambda row: row['doi']):
+        yield doi, list(group)
 
 
-def strategy_keep_recent(conn, dry_run=True):
+# ORDER BY for ranking papers within a DOI group; rank 1 is kept (mirrors the Python strategies)
+KEEP_RECENT_ORDER = "collection_date DESC, pmid"
+KEEP_FULLTEXT_ORDER = "is_full_text_pmc DESC, collection_date DESC, pmid"
+
+RANKED_DUPLICATES_SQL = """
+    SELECT pmid FROM (
+        SELECT pmid, ROW_NUMBER() OVER (PARTITION BY doi ORDER BY {order}) AS rn
+        FROM papers
+        WHERE doi IS NOT NULL AND doi != ''
+    )
+    WHERE rn > 1
+"""
+
+
+def resolve_in_sql(conn, order_by: str, strategy: str, dry_run=True, quiet=False):
     """
-    Strategy 1: Keep the most recently collected entry for each duplicate DOI
+    Delete every duplicate except the top-ranked paper per DOI in one statement
+    
+    Ranking is done by a ROW_NUMBER() window (SQLite >= 3.25), so no rows are
+    loaded into Python; the dry run only lists the PMIDs that would be deleted.
     """
     cursor = conn.cursor()
-    duplicates = get_duplicate_dois(cursor)
+    select_sql = RANKED_DUPLICATES_SQL.format(order=order_by)
+    
+    if dry_run:
+        if quiet:
+            cursor.execute(f"SELECT COUNT(*) FROM ({select_sql})")
+            total_to_delete = cursor.fetchone()[0]
+        else:
+            cursor.execute(select_sql)
+            total_to_delete = 0
+            for (pmid,) in cursor:
+                print(f"  ✗ DELETE: PMID {pmid}")
+                total_to_delete += 1
+        print(f"\nSummary: Will delete {total_to_delete} duplicate entries")
+        print("\nTo apply these changes, run with --apply flag:")
+        print(f"  python scripts/resolve_doi_duplicates.py --strategy {strategy} --fast --apply")
+        return 0
+    
+    print("Deleting duplicate entries...")
+    with immediate_transaction(conn):
+        cursor.execute(f"DELETE FROM papers WHERE pmid IN ({select_sql})")
+    print(f"✅ Deleted {cursor.rowcount} duplicate entries")
+    return cursor.rowcount
+
+
+def strategy_keep_recent(conn, dry_run=True, fast=False, quiet=False):
+    """
+    Strategy 1: Keep the most recently collected entry for each duplicate DOI
     
+    Returns the number of papers deleted (0 on a dry run).
+    """
     print("="*80)
     print("STRATEGY: Keep Most Recent Entry")
     print("="*80)
     print(f"Mode: {'DRY RUN (no changes will be made)' if dry_run else 'LIVE (changes will be applied)'}")
     print()
     
+    if fast:
+        return resolve_in_sql(conn, KEEP_RECENT_ORDER, 'keep-recent', dry_run, quiet)
+    
+    cursor = conn.cursor()
+    duplicates = get_all_duplicate_papers(cursor, KEY_COLUMNS)
+    
     if not duplicates:
         print("✅ No duplicates found!")
-        return
+        return 0
     
     total_to_delete = 0
     deleted_pmids = []
     
-    for dup in duplicates:
-        doi = dup['doi']
-        papers = get_papers_by_doi(cursor, doi)
+    for doi, papers in group_by_doi(duplicates):
         
         # Keep the first one (most recent by collection_date)
         keep_paper = papers[0]
         delete_papers = papers[1:]
         
-        print(f"DOI: {doi}")
-        print(f"  ✓ KEEP:   PMID {keep_paper['pmid']} (collected: {keep_paper['collection_date']})")
+        total_to_delete += len(delete_papers)
+        deleted_pmids.extend(paper['pmid'] for paper in delete_papers)
+        if quiet:
+            continue
         
+        # One write per group instead of one print() per line
+        lines = [
+            f"DOI: {doi}",
+            f"  ✓ KEEP:   PMID {keep_paper['pmid']} (collected: {keep_paper['collection_date']})",
+        ]
         for paper in delete_papers:
-            print(f"  ✗ DELETE: PMID {paper['pmid']} (collected: {paper['collection_date']})")
-            total_to_delete += 1
-            deleted_pmids.append(paper['pmid'])
-        print()
+            lines.append(f"  ✗ DELETE: PMID {paper['pmid']} (collected: {paper['collection_date']})")
+        print('\n'.join(lines), end='\n\n')
     
     print(f"Summary: Will delete {total_to_delete} duplicate entries")
     
     if not dry_run:
         print("\nDeleting duplicate entries...")
-        for pmid in deleted_pmids:
-            cursor.execute("DELETE FROM papers WHERE pmid = ?", (pmid,))
-        conn.commit()
+        with immediate_transaction(conn):
+            delete_pmids(cursor, deleted_pmids)
         print(f"✅ Deleted {total_to_delete} duplicate entries")
-    else:
-        print("\nTo apply these changes, run with --apply flag:")
-        print("  python scripts/resolve_doi_duplicates.py --strategy keep-recent --apply")
+        return total_to_delete
+    
+    print("\nTo apply these changes, run with --apply flag:")
+    print("  python scripts/resolve_doi_duplicates.py --strategy keep-recent --apply")
+    return 0
 
 
-def strategy_keep_fulltext(conn, dry_run=True):
+def strategy_keep_fulltext(conn, dry_run=True, fast=False, quiet=False):
     """
     Strategy 2: Keep entry with full text, fall back to most recent if ambiguous
-    """
-    cursor = conn.cursor()
-    duplicates = get_duplicate_dois(cursor)
     
+    Returns the number of papers deleted (0 on a dry run).
+    """
     print("="*80)
     print("STRATEGY: Keep Entry with Full Text")
     print("="*80)
     print(f"Mode: {'DRY RUN (no changes will be made)' if dry_run else 'LIVE (changes will be applied)'}")
     print()
     
+    if fast:
+        return resolve_in_sql(conn, KEEP_FULLTEXT_ORDER, 'keep-fulltext', dry_run, quiet)
+    
+    cursor = conn.cursor()
+    duplicates = get_all_duplicate_papers(cursor, KEY_COLUMNS)
+    
     if not duplicates:
         print("✅ No duplicates found!")
-        return
+        return 0
     
     total_to_delete = 0
     deleted_pmids = []
     
-    for dup in duplicates:
-        doi = dup['doi']
-        papers = get_papers_by_doi(cursor, doi)
+    for doi, papers in group_by_doi(duplicates):
         
         # Separate papers with and without full text
         with_fulltext = [p for p in papers if p['is_full_text_pmc']]
@@ -131,35 +225,40 @@ def strategy_keep_fulltext(conn, dry_run=True):
             delete_papers = papers[1:]
             reason = "most recent (none have full text)"
         
-        print(f"DOI: {doi}")
-        print(f"  ✓ KEEP:   PMID {keep_paper['pmid']} ({reason})")
+        total_to_delete += len(delete_papers)
+        deleted_pmids.extend(paper['pmid'] for paper in delete_papers)
+        if quiet:
+            continue
         
+        # One write per group instead of one print() per line
+        lines = [f"DOI: {doi}", f"  ✓ KEEP:   PMID {keep_paper['pmid']} ({reason})"]
         for paper in delete_papers:
             ft_status = "has full text" if paper['is_full_text_pmc'] else "no full text"
-            print(f"  ✗ DELETE: PMID {paper['pmid']} ({ft_status})")
-            total_to_delete += 1
-            deleted_pmids.append(paper['pmid'])
-        print()
+            lines.append(f"  ✗ DELETE: PMID {paper['pmid']} ({ft_status})")
+        print('\n'.join(lines), end='\n\n')
     
     print(f"Summary: Will delete {total_to_delete} duplicate entries")
     
     if not dry_run:
         print("\nDeleting duplicate entries...")
-        for pmid in deleted_pmids:
-            cursor.execute("DELETE FROM papers WHERE pmid = ?", (pmid,))
-        conn.commit()
+        with immediate_transaction(conn):
+            delete_pmids(cursor, deleted_pmids)
         print(f"✅ Deleted {total_to_delete} duplicate entries")
-    else:
-        print("\nTo apply these changes, run with --apply flag:")
-        print("  python scripts/resolve_doi_duplicates.py --strategy keep-fulltext --apply")
+        return total_to_delete
+    
+    print("\nTo apply these changes, run with --apply flag:")
+    print("  python scripts/resolve_doi_duplicates.py --strategy keep-fulltext --apply")
+    return 0
 
 
-def strategy_merge(conn, dry_run=True):
+def strategy_merge(conn, dry_run=True, quiet=False):
     """
     Strategy 3: Merge duplicate entries, keeping most complete data
+    
+    Returns the number of papers deleted (0 on a dry run).
     """
     cursor = conn.cursor()
-    duplicates = get_duplicate_dois(cursor)
+    duplicates = get_all_duplicate_papers(cursor)
     
     print("="*80)
     print("STRATEGY: Merge Duplicates")
@@ -169,66 +268,68 @@ def strategy_merge(conn, dry_run=True):
     
     if not duplicates:
         print("✅ No duplicates found!")
-        return
+        return 0
     
-    for dup in duplicates:
-        doi = dup['doi']
-        papers = get_papers_by_doi(cursor, doi)
-        
-        print(f"DOI: {doi}")
-        print(f"  Merging {len(papers)} entries:")
+    # (merged values..., pmid) per primary and PMIDs to drop, written in one transaction
+    update_columns = [key for key in duplicates[0].keys() if key != 'pmid']
+    updates = []
+    all_delete_pmids = []
+    total_groups = 0
+    total_to_delete = 0
+    
+    for doi, papers in group_by_doi(duplicates):
         
         # Choose the "primary" entry (most recent)
         primary = papers[0]
         others = papers[1:]
+        total_groups += 1
+        total_to_delete += len(others)
         
         merged_data = dict(primary)
         changes = []
         
         # Merge logic: keep non-null values from all entries
         for other in others:
-            for key, value in other.items():
+            for key, value in zip(other.keys(), other):
                 if key == 'pmid':
                     continue  # Don't merge PMIDs
                 
                 # If primary is null/empty but other has value, use other's value
                 if (not merged_data[key] or merged_data[key] == '') and value and value != '':
-                    changes.append(f"    - Updated {key}: {merged_data[key]} → {value}")
+                    if not quiet:
+                        changes.append(f"    - Updated {key}: {merged_data[key]} → {value}")
                     merged_data[key] = value
         
-        if changes:
-            print(f"  Primary PMID: {primary['pmid']}")
-            print(f"  Changes from merge:")
-            for change in changes:
-                print(change)
-        else:
-            print(f"  Primary PMID: {primary['pmid']} (no additional data to merge)")
-        
-        print(f"  Will delete: {', '.join([p['pmid'] for p in others])}")
-        print()
+        if not quiet:
+            # One write per group instead of one print() per line
+            lines = [f"DOI: {doi}", f"  Merging {len(papers)} entries:"]
+            if changes:
+                lines.append(f"  Primary PMID: {primary['pmid']}")
+                lines.append(f"  Changes from merge:")
+                lines.extend(changes)
+            else:
+                lines.append(f"  Primary PMID: {primary['pmid']} (no additional data to merge)")
+            lines.append(f"  Will delete: {', '.join([p['pmid'] for p in others])}")
+            print('\n'.join(lines), end='\n\n')
         
         if not dry_run:
-            # Update primary with merged data
-            update_fields = ', '.join([f"{k} = ?" for k in merged_data.keys() if k != 'pmid'])
-            update_values = [v for k, v in merged_data.items() if k != 'pmid']
-            update_values.append(primary['pmid'])
-            
-            cursor.execute(f"""
-                UPDATE papers
-                SET {update_fields}
-                WHERE pmid = ?
-            """, update_values)
-            
-            # Delete others
-            for other in others:
-                cursor.execute("DELETE FROM papers WHERE pmid = ?", (other['pmid'],))
+            updates.append(tuple(merged_data[key] for key in update_columns) + (primary['pmid'],))
+            all_delete_pmids.extend(p['pmid'] for p in others)
+    
+    if quiet:
+        print(f"Summary: Will merge {total_groups} duplicate groups, deleting {total_to_delete} entries")
     
     if not dry_run:
-        conn.commit()
+        update_fields = ', '.join(f"{key} = ?" for key in update_columns)
+        with immediate_transaction(conn):
+            cursor.executemany(f"UPDATE papers SET {update_fields} WHERE pmid = ?", updates)
+            delete_pmids(cursor, all_delete_pmids)
         print(f"✅ Merged and deleted duplicates")
-    else:
-        print("\nTo apply these changes, run with --apply flag:")
-        print("  python scripts/resolve_doi_duplicates.py --strategy merge --apply")
+        return len(all_delete_pmids)
+    
+    print("\nTo apply these changes, run with --apply flag:")
+    print("  python scripts/resolve_doi_duplicates.py --strategy merge --apply")
+    return 0
 
 
 def strategy_export(conn, output_path=None):
@@ -236,13 +337,14 @@ def strategy_export(conn, output_path=None):
     Strategy 4: Export duplicates for manual review
     """
     cursor = conn.cursor()
-    duplicates = get_duplicate_dois(cursor)
+    cursor.execute(f"SELECT COUNT(*), COALESCE(SUM(count), 0) FROM ({DUPLICATE_GROUPS_SQL})")
+    total_groups, total_entries = cursor.fetchone()
     
     print("="*80)
     print("STRATEGY: Export for Manual Review")
     print("="*80)
     
-    if not duplicates:
+    if not total_groups:
         print("✅ No duplicates found!")
         return
     
@@ -252,38 +354,71 @@ def strategy_export(conn, output_path=None):
             'paper_collection', 'data', 'doi_duplicates_export.json'
         )
     
-    export_data = []
-    
-    for dup in duplicates:
-        doi = dup['doi']
-        papers = get_papers_by_doi(cursor, doi)
+    # Stream one duplicate group at a time, laid out exactly as json.dump(indent=2)
+    # would write the whole document, so memory stays at a single group
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('{\n')
+        f.write(f'  "export_date": {json.dumps(datetime.now().isoformat())},\n')
+        f.write(f'  "total_duplicate_groups": {total_groups},\n')
+        f.write(f'  "total_duplicate_entries": {total_entries},\n')
+        f.write('  "duplicates": [')
+        
+        inner = '\n    '
+        cursor.execute(DUPLICATE_PAPERS_SQL.format(columns="p.*"))
+        for i, (doi, papers) in enumerate(group_by_doi(cursor)):
+            group = {'doi': doi, 'count': len(papers), 'papers': [dict(row) for row in papers]}
+            f.write((',' if i else '') + inner + json.dumps(group, indent=2, ensure_ascii=False).replace('\n', inner))
         
-        export_data.append({
-            'doi': doi,
-            'count': len(papers),
-            'papers': papers
-        })
+        f.write('\n  ]\n}')
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump({
-            'export_date': datetime.now().isoformat(),
-            'total_duplicate_groups': len(duplicates),
-            'total_duplicate_entries': sum(d['count'] for d in duplicates),
-            'duplicates': export_data
-        }, f, indent=2, ensure_ascii=False)
-    
-    print(f"✅ Exported {len(duplicates)} duplicate groups to:")
+    print(f"✅ Exported {total_groups} duplicate groups to:")
     print(f"   {output_path}")
     print(f"\nYou can review this file and manually decide which entries to keep.")
 
 
+def refresh_after_deletes(conn, vacuum=False):
+    """
+    Refresh query-planner statistics after bulk deletes, optionally compacting the file
+    
+    VACUUM rewrites the whole database to drop the freed pages, so it is opt-in.
+    papers has no INTEGER PRIMARY KEY, so VACUUM may renumber its rowids; the
+    full-text index is keyed on rowid, so it is rebuilt afterwards (which also
+    leaves it fully merged).
+    """
+    print("\nRefreshing query planner statistics...")
+    conn.execute("ANALYZE papers")
+    conn.commit()
+    
+    if vacuum:
+        print("Vacuuming database...")
+        conn.execute("VACUUM")
+        has_fts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'papers_fts'"
+        ).fetchone()
+        if has_fts:
+            print("Rebuilding full-text index...")
+            with immediate_transaction(conn):
+                conn.execute("INSERT INTO papers_fts(papers_fts) VALUES('rebuild')")
+    print("✅ Database maintenance complete")
+
+
 def backup_database(db_path: str) -> str:
-    """Create a backup of the database"""
+    """
+    Create a backup of the database with SQLite's online backup API
+    
+    Unlike a plain file copy, this copies page by page through SQLite, so
+    transactions still sitting in the -wal file are included.
+    """
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     backup_path = db_path.replace('.db', f'_backup_{timestamp}.db')
     
-    import shutil
-    shutil.copy2(db_path, backup_path)
+    source = sqlite3.connect(db_path)
+    backup = sqlite3.connect(backup_path)
+    try:
+        source.backup(backup, pages=1024)
+    finally:
+        backup.close()
+        source.close()
     return backup_path
 
 
@@ -299,6 +434,9 @@ Examples:
   # Apply changes (with automatic backup)
   python scripts/resolve_doi_duplicates.py --strategy keep-recent --apply
   
+  # Resolve entirely in SQL (window function, no per-group preview)
+  python scripts/resolve_doi_duplicates.py --strategy keep-recent --fast --apply
+  
   # Export for manual review
   python scripts/resolve_doi_duplicates.py --strategy export
   
@@ -323,6 +461,24 @@ Strategies:
         help='Apply changes (default is dry run)'
     )
     
+    parser.add_argument(
+        '--quiet',
+        action='store_true',
+        help='Only print summaries, not every duplicate group'
+    )
+    
+    parser.add_argument(
+        '--fast',
+        action='store_true',
+        help='keep-recent/keep-fulltext only: resolve in a single SQL statement'
+    )
+    
+    parser.add_argument(
+        '--vacuum',
+        action='store_true',
+        help='After applying deletions, VACUUM the database to reclaim disk space'
+    )
+    
     parser.add_argument(
         '--db-path',
         help='Path to database (default: paper_collection/data/papers.db)'
@@ -336,6 +492,9 @@ Strategies:
     
     args = parser.parse_args()
     
+    if args.fast and args.strategy not in ('keep-recent', 'keep-fulltext'):
+        parser.error("--fast is only supported for keep-recent and keep-fulltext")
+    
     # Get database path
     if args.db_path:
         db_path = args.db_path
@@ -356,22 +515,28 @@ Strategies:
         print(f"✅ Backup created: {backup_path}\n")
     
     # Connect to database
-    conn = sqlite3.connect(db_path)
+    conn = open_tuned(db_path)
     conn.row_factory = sqlite3.Row
     
     try:
+        ensure_doi_index(conn)
+        
         # Execute strategy
+        deleted = 0
         if args.strategy == 'keep-recent':
-            strategy_keep_recent(conn, dry_run=not args.apply)
+            deleted = strategy_keep_recent(conn, dry_run=not args.apply, fast=args.fast, quiet=args.quiet)
         elif args.strategy == 'keep-fulltext':
-            strategy_keep_fulltext(conn, dry_run=not args.apply)
+            deleted = strategy_keep_fulltext(conn, dry_run=not args.apply, fast=args.fast, quiet=args.quiet)
         elif args.strategy == 'merge':
-            strategy_merge(conn, dry_run=not args.apply)
+            deleted = strategy_merge(conn, dry_run=not args.apply, quiet=args.quiet)
         elif args.strategy == 'export':
             strategy_export(conn)
+        
+        if deleted:
+            refresh_after_deletes(conn, vacuum=args.vacuum)
     
     finally:
-        conn.close()
+        close_tuned(conn)
 
 
 if __name__ == "__main__":
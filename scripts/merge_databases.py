@@ -10,9 +10,13 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.database import PaperDatabase
 from src.models import PaperMetadata
 import sqlite3
+from itertools import islice
 from typing import Optional
 import json
 
+# Papers written to the target per insert_papers_batch transaction
+WRITE_BATCH_SIZE = 1000
+
 def merge_field(existing_value, new_value, prefer_longest=False):
     """
     Merge two field values intelligently.
@@ -64,11 +68,88 @@ def merge_list_field(existing_list, new_list):
     if not new_list:
         return existing_list
     
-    # Combine and deduplicate
-    combined = existing_list + [item for item in new_list if item not in existing_list]
+    # Combine and deduplicate (set membership: O(1) per item instead of a list scan)
+    existing_items = set(existing_list)
+    combined = existing_list + [item for item in new_list if item not in existing_items]
     return combined
 
 
+def index_target_keys(pmid: str, doi: Optional[str], by_doi: dict, pmids: set):
+    """
+    Add a target paper's keys to the in-memory DOI/PMID lookup tables.
+    
+    The first PMID seen for a DOI keeps the DOI slot, like the old
+    SELECT ... WHERE doi = ? lookup returning the lowest-rowid match.
+    """
+    pmids.add(pmid)
+    if doi and doi not in by_doi:
+        by_doi[doi] = pmid
+
+
+def load_target_keys(target_db: PaperDatabase, source_db_path: str, by_doi: dict, pmids: set):
+    """
+    Load the keys of target papers that share a DOI or PMID with the source.
+    
+    The source is attached to the target connection so SQLite resolves the
+    match through the target's DOI and PMID indexes; target papers that no
+    source paper can match are never read.
+    """
+    conn = target_db.conn
+    conn.execute("ATTACH DATABASE ? AS src", (source_db_path,))
+    try:
+        rows = conn.execute("""
+            SELECT pmid, doi FROM main.papers
+            WHERE doi IN (SELECT doi FROM src.papers WHERE doi IS NOT NULL AND doi != '')
+               OR pmid IN (SELECT pmid FROM src.papers)
+            ORDER BY rowid
+        """).fetchall()
+    finally:
+        conn.execute("DETACH DATABASE src")
+    
+    for pmid, doi in rows:
+        index_target_keys(pmid, doi, by_doi, pmids)
+
+
+def match_target_pmid(paper: PaperMetadata, by_doi: dict, pmids: set) -> Optional[str]:
+    """PMID of the target paper a source paper merges into: by DOI first, then by PMID"""
+    target_pmid = by_doi.get(paper.doi) if paper.doi else None
+    if not target_pmid and paper.pmid in pmids:
+        target_pmid = paper.pmid
+    return target_pmid
+
+
+def iter_with_target_papers(papers, target_db: PaperDatabase, by_doi: dict, pmids: set, batch_size: int):
+    """
+    Yield (source_paper, prefetched) pairs, where prefetched maps PMID to the
+    matching target papers of the whole batch, loaded with one IN query.
+    
+    Each batch is fetched only when the previous one has been consumed, so
+    writes flushed at the batch boundary are visible to the next fetch.
+    """
+    papers = iter(papers)
+    while True:
+        batch = list(islice(papers, batch_size))
+        if not batch:
+            return
+        target_pmids = {match_target_pmid(paper, by_doi, pmids) for paper in batch} - {None}
+        prefetched = target_db.get_papers_by_pmids(list(target_pmids))
+        for paper in batch:
+            yield paper, prefetched
+
+
+def write_pending_papers(target_db: PaperDatabase, pending_writes: dict) -> list:
+    """
+    Write the pending papers to the target in one transaction.
+    
+    Returns:
+        PMIDs of the pending papers that could not be written (only possible
+        when the batch falls back to per-paper inserts)
+    """
+    saved = target_db.insert_papers_batch(list(pending_writes.values()))
+    saved_pmids = {paper.pmid for paper in saved}
+    return [pmid for pmid in pending_writes if pmid not in saved_pmids]
+
+
 def merge_papers(existing: PaperMetadata, new: PaperMetadata) -> PaperMetadata:
     """
     Intelligently merge two paper metadata objects.
@@ -146,42 +227,71 @@ def merge_databases(
     
     # Get statistics before merge
     print("📊 Initial Statistics:")
-    print(f"  Source DB: {len(source_db.get_all_papers()):,} papers")
-    print(f"  Target DB: {len(target_db.get_all_papers()):,} papers")
+    source_total = source_db.count_papers()
+    print(f"  Source DB: {source_total:,} papers")
+    print(f"  Target DB: {target_db.count_papers():,} papers")
     print()
     
-    # Get all papers from source
-    source_papers = source_db.get_all_papers()
-    
     # Counters
     added_count = 0
     merged_count = 0
+    unchanged_count = 0  # Merged papers identical to the existing target row (not rewritten)
     skipped_count = 0
     errors = []
     
-    print(f"Processing {len(source_papers):,} papers from source database...")
+    # Keys of the target papers the source can match (DOI -> PMID, PMID set);
+    # full target rows are only loaded per batch for actual matches
+    target_by_doi = {}
+    target_pmids = set()
+    load_target_keys(target_db, source_db_path, target_by_doi, target_pmids)
+    
+    # Merged/new papers waiting to be written in one transaction, by PMID,
+    # with how many adds/merges each one carries (undone if its write fails)
+    pending_writes = {}
+    pending_counts = {}
+    
+    def flush_pending_writes():
+        nonlocal added_count, merged_count, skipped_count
+        for pmid in write_pending_papers(target_db, pending_writes):
+            added, merged = pending_counts[pmid]
+            added_count -= added
+            merged_count -= merged
+            skipped_count += added + merged
+            errors.append((pmid, "Failed to write paper to target database"))
+        pending_writes.clear()
+        pending_counts.clear()
+    
+    print(f"Processing {source_total:,} papers from source database...")
     print()
     
-    for i, source_paper in enumerate(source_papers):
+    # Stream source papers in fetchmany batches instead of loading the whole table
+    source_papers = iter_with_target_papers(
+        source_db.iter_papers(), target_db, target_by_doi, target_pmids, WRITE_BATCH_SIZE
+    )
+    for i, (source_paper, prefetched) in enumerate(source_papers):
         if (i + 1) % 100 == 0:
-            print(f"  Progress: {i+1:,}/{len(source_papers):,} papers processed...", end='\r')
+            print(f"  Progress: {i+1:,}/{source_total:,} papers processed...", end='\r')
         
         try:
-            # Check if paper exists by DOI (primary) or PMID (fallback)
+            # Check if paper exists by DOI (primary) or PMID (fallback); papers
+            # written earlier in this batch are not in the prefetched rows yet
             existing_paper = None
+            target_pmid = match_target_pmid(source_paper, target_by_doi, target_pmids)
             
-            if source_paper.doi:
-                existing_paper = target_db.get_paper_by_doi(source_paper.doi)
-            
-            if not existing_paper and source_paper.pmid:
-                existing_paper = target_db.get_paper(source_paper.pmid)
+            if target_pmid:
+                existing_paper = pending_writes.get(target_pmid) or prefetched.get(target_pmid)
             
             if existing_paper:
                 # Paper exists - merge it
                 merged_paper = merge_papers(existing_paper, source_paper)
                 
-                if not dry_run:
-                    target_db.insert_paper(merged_paper)
+                if merged_paper == existing_paper:
+                    # Source adds nothing: skip the write entirely
+                    unchanged_count += 1
+                elif not dry_run:
+                    pending_writes[merged_paper.pmid] = merged_paper
+                    pending_counts.setdefault(merged_paper.pmid, [0, 0])[1] += 1
+                    index_target_keys(merged_paper.pmid, merged_paper.doi, target_by_doi, target_pmids)
                 
                 merged_count += 1
                 
@@ -216,7 +326,9 @@ def merge_databases(
             else:
                 # Paper doesn't exist - add it
                 if not dry_run:
-                    target_db.insert_paper(source_paper)
+                    pending_writes[source_paper.pmid] = source_paper
+                    pending_counts.setdefault(source_paper.pmid, [0, 0])[0] += 1
+                    index_target_keys(source_paper.pmid, source_paper.doi, target_by_doi, target_pmids)
                 
                 added_count += 1
                 
@@ -228,8 +340,15 @@ def merge_databases(
         except Exception as e:
             errors.append((source_paper.pmid or source_paper.doi, str(e)))
             skipped_count += 1
+        
+        # Flush at the batch boundary, before the next batch's target rows are fetched
+        if (i + 1) % WRITE_BATCH_SIZE == 0 and pending_writes:
+            flush_pending_writes()
+    
+    if pending_writes:
+        flush_pending_writes()
     
-    print(f"\n  Progress: {len(source_papers):,}/{len(source_papers):,} papers processed... DONE\n")
+    print(f"\n  Progress: {source_total:,}/{source_total:,} papers processed... DONE\n")
     
     # Final statistics
     print("="*80)
@@ -238,11 +357,12 @@ def merge_databases(
     print(f"\n📊 Results:")
     print(f"  ✅ Papers added: {added_count:,}")
     print(f"  🔄 Papers merged: {merged_count:,}")
+    print(f"  ⏭️  Already up to date (not rewritten): {unchanged_count:,}")
     print(f"  ❌ Errors/Skipped: {skipped_count:,}")
-    print(f"  📝 Total processed: {len(source_papers):,}")
+    print(f"  📝 Total processed: {source_total:,}")
     
     if not dry_run:
-        print(f"\n  Final target DB size: {len(target_db.get_all_papers()):,} papers")
+        print(f"\n  Final target DB size: {target_db.count_papers():,} papers")
     
     if errors:
         print(f"\n⚠️  Errors encountered:")
@@ -260,6 +380,7 @@ def merge_databases(
     return {
         'added': added_count,
         'merged': merged_count,
+        'unchanged': unchanged_count,
         'skipped': skipped_count,
         'errors': errors
     }
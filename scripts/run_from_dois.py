@@ -53,13 +53,10 @@ USE_THREADING = True  # Set to False for debugging
 
 def load_dois_from_file(filepath):
     """Load DOIs from a text file (one DOI per line)"""
-    dois = []
     with open(filepath, 'r') as f:
-        for line in f:
-            doi = line.strip()
-            if doi and not doi.startswith('#'):  # Skip empty lines and comments
-                dois.append(doi)
-    return dois
+        lines = f.read().splitlines()
+    # Skip empty lines and comments
+    return [doi for line in lines if (doi := line.strip()) and not doi.startswith('#')]
 
 
 # Load DOIs from file if specified, otherwise use the list
@@ -12,6 +12,7 @@ import sys
 import os
 import argparse
 import json
+import time
 from datetime import datetime
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -23,17 +24,28 @@ from main import collect_papers
 
 class TeeOutput:
     """Capture stdout/stderr and write to both console and file"""
+    # Block-buffer the log file instead of one write syscall per line, but
+    # push it to disk at least this often so the log can still be tailed
+    FILE_BUFFER_SIZE = 64 * 1024
+    FILE_FLUSH_INTERVAL = 1.0  # seconds
+    
     def __init__(self, file_path, original_stream):
-        self.file = open(file_path, 'w', buffering=1)  # Line buffered
+        self.file = open(file_path, 'w', buffering=self.FILE_BUFFER_SIZE)
         self.original_stream = original_stream
+        self._last_file_flush = time.monotonic()
     
     def write(self, message):
         self.original_stream.write(message)
         self.file.write(message)
+        now = time.monotonic()
+        if now - self._last_file_flush >= self.FILE_FLUSH_INTERVAL:
+            self.file.flush()
+            self._last_file_flush = now
     
     def flush(self):
         self.original_stream.flush()
         self.file.flush()
+        self._last_file_flush = time.monotonic()
     
     def close(self):
         self.file.close()
@@ -214,47 +226,14 @@ try:
         # Collect papers
         print("Starting paper collection...")
         
-        # Handle test database by monkey-patching the config after collect_papers sets it
-        if USE_TEST_DB and OUTPUT_DIR:
-            # Store original collect_papers function
-            from main import collect_papers as original_collect_papers
-            from src.config import set_output_directory
-            import src.config
-            
-            def patched_collect_papers(*args, **kwargs):
-                # Call the original function but patch DATABASE_PATH after set_output_directory
-                # We need to patch it right after the output directory is set
-                original_set_output_directory = set_output_directory
-                
-                def patched_set_output_directory(custom_dir):
-                    result = original_set_output_directory(custom_dir)
-                    # Override the database path to use test database
-                    src.config.DATABASE_PATH = os.path.join(result['data_dir'], 'test_papers.db')
-                    print(f"Test database path set to: {src.config.DATABASE_PATH}")
-                    return result
-                
-                # Temporarily replace the function
-                import src.config
-                src.config.set_output_directory = patched_set_output_directory
-                
-                try:
-                    return original_collect_papers(*args, **kwargs)
-                finally:
-                    # Restore original function
-                    src.config.set_output_directory = original_set_output_directory
-            
-            # Use the patched version
-            collect_papers_func = patched_collect_papers
-        else:
-            collect_papers_func = collect_papers
-        
-        collect_papers_func(
+        collect_papers(
             query=query+QUERIES_SUFFIX if USE_SUFFIX else query, 
             max_results=MAX_RESULTS,  # Use configurable max results
             use_threading=True,  # Enable parallel processing for much faster execution
             output_dir=OUTPUT_DIR,
             query_description=query_run_name,
-            check_num=CHECK_NUM
+            check_num=CHECK_NUM,
+            database_filename="test_papers.db" if USE_TEST_DB else "papers.db"
         )
 
         # Print results location
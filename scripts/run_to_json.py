@@ -29,22 +29,52 @@ from src.config import (
 
 class TeeOutput:
     """Capture stdout/stderr and write to both console and file"""
+    # Block-buffer the log file instead of one write syscall per line, but
+    # push it to disk at least this often so the log can still be tailed
+    FILE_BUFFER_SIZE = 64 * 1024
+    FILE_FLUSH_INTERVAL = 1.0  # seconds
+    
     def __init__(self, file_path, original_stream):
-        self.file = open(file_path, 'w', buffering=1)  # Line buffered
+        self.file = open(file_path, 'w', buffering=self.FILE_BUFFER_SIZE)
         self.original_stream = original_stream
+        self._last_file_flush = time.monotonic()
     
     def write(self, message):
         self.original_stream.write(message)
         self.file.write(message)
+        now = time.monotonic()
+        if now - self._last_file_flush >= self.FILE_FLUSH_INTERVAL:
+            self.file.flush()
+            self._last_file_flush = now
     
     def flush(self):
         self.original_stream.flush()
         self.file.flush()
+        self._last_file_flush = time.monotonic()
     
     def close(self):
         self.file.close()
 
 
+def save_papers_json(path, papers):
+    """
+    Write papers to a JSON array file, serializing one paper at a time.
+    
+    Same output as json.dump([p.to_dict() for p in papers], f, indent=2,
+    ensure_ascii=False), without building the list of dicts first.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        count = 0
+        for paper in papers:
+            if count:
+                f.write(',')
+            # Escaped JSON strings never contain raw newlines, so re-indenting by line is safe
+            f.write('\n  ' + json.dumps(paper.to_dict(), indent=2, ensure_ascii=False).replace('\n', '\n  '))
+            count += 1
+        f.write('\n]' if count else ']')
+
+
 def process_batch_to_json(pmid_batch: List[str], existing_pmids: set) -> Tuple[List[PaperMetadata], int]:
     """
     Process a batch of PMIDs and return metadata objects (no database storage).
@@ -269,8 +299,7 @@ def collect_papers_to_json(query: str, max_results: int = 50000, use_threading:
                     
                     # Save checkpoint file
                     checkpoint_file = run_dir / f"papers_checkpoint_{i+1}.json"
-                    with open(checkpoint_file, 'w', encoding='utf-8') as f:
-                        json.dump([p.to_dict() for p in all_papers], f, indent=2, ensure_ascii=False)
+                    save_papers_json(checkpoint_file, all_papers)
                     print(f"  Checkpoint saved to: {checkpoint_file}")
     else:
         # Single-threaded processing (for debugging)
@@ -310,22 +339,17 @@ def collect_papers_to_json(query: str, max_results: int = 50000, use_threading:
     
     # Save all papers to JSON
     papers_file = run_dir / "papers_all.json"
-    with open(papers_file, 'w', encoding='utf-8') as f:
-        json.dump([p.to_dict() for p in all_papers], f, indent=2, ensure_ascii=False)
+    save_papers_json(papers_file, all_papers)
     print(f"  All papers saved to: {papers_file}")
     
     # Save papers with full text
-    papers_with_fulltext = [p for p in all_papers if p.is_full_text_pmc]
     fulltext_file = run_dir / "papers_with_fulltext.json"
-    with open(fulltext_file, 'w', encoding='utf-8') as f:
-        json.dump([p.to_dict() for p in papers_with_fulltext], f, indent=2, ensure_ascii=False)
+    save_papers_json(fulltext_file, (p for p in all_papers if p.is_full_text_pmc))
     print(f"  Papers with full text saved to: {fulltext_file}")
     
     # Save papers without full text
-    papers_without_fulltext = [p for p in all_papers if not p.is_full_text_pmc]
     no_fulltext_file = run_dir / "papers_without_fulltext.json"
-    with open(no_fulltext_file, 'w', encoding='utf-8') as f:
-        json.dump([p.to_dict() for p in papers_without_fulltext], f, indent=2, ensure_ascii=False)
+    save_papers_json(no_fulltext_file, (p for p in all_papers if not p.is_full_text_pmc))
     print(f"  Papers without full text saved to: {no_fulltext_file}")
     
     # Save statistics
@@ -503,8 +527,7 @@ def collect_papers_from_dois_to_json(dois: List[str], use_threading: bool = True
                     
                     # Save checkpoint file
                     checkpoint_file = run_dir / f"papers_checkpoint_{i+1}.json"
-                    with open(checkpoint_file, 'w', encoding='utf-8') as f:
-                        json.dump([p.to_dict() for p in all_papers], f, indent=2, ensure_ascii=False)
+                    save_papers_json(checkpoint_file, all_papers)
                     print(f"  Checkpoint saved to: {checkpoint_file}")
     else:
         # Single-threaded processing (for debugging)
@@ -544,22 +567,17 @@ def collect_papers_from_dois_to_json(dois: List[str], use_threading: bool = True
     
     # Save all papers to JSON
     papers_file = run_dir / "papers_all.json"
-    with open(papers_file, 'w', encoding='utf-8') as f:
-        json.dump([p.to_dict() for p in all_papers], f, indent=2, ensure_ascii=False)
+    save_papers_json(papers_file, all_papers)
     print(f"  All papers saved to: {papers_file}")
     
     # Save papers with full text
-    papers_with_fulltext = [p for p in all_papers if p.is_full_text_pmc]
     fulltext_file = run_dir / "papers_with_fulltext.json"
-    with open(fulltext_file, 'w', encoding='utf-8') as f:
-        json.dump([p.to_dict() for p in papers_with_fulltext], f, indent=2, ensure_ascii=False)
+    save_papers_json(fulltext_file, (p for p in all_papers if p.is_full_text_pmc))
     print(f"  Papers with full text saved to: {fulltext_file}")
     
     # Save papers without full text
-    papers_without_fulltext = [p for p in all_papers if not p.is_full_text_pmc]
     no_fulltext_file = run_dir / "papers_without_fulltext.json"
-    with open(no_fulltext_file, 'w', encoding='utf-8') as f:
-        json.dump([p.to_dict() for p in papers_without_fulltext], f, indent=2, ensure_ascii=False)
+    save_papers_json(no_fulltext_file, (p for p in all_papers if not p.is_full_text_pmc))
     print(f"  Papers without full text saved to: {no_fulltext_file}")
     
     # Save statistics
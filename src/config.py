@@ -111,13 +111,14 @@ for directory in [BASE_DIR, DATA_DIR, CHECKPOINT_DIR, LOGS_DIR]:
     os.makedirs(directory, exist_ok=True)
 
 
-def set_output_directory(custom_dir: str):
+def set_output_directory(custom_dir: str, database_filename: str = 'papers.db'):
     """
     Set a custom output directory for the collection.
     
     Args:
         custom_dir: Path to custom directory (relative or absolute)
                    If relative, will be relative to PROJECT_ROOT
+        database_filename: Name of the SQLite file inside <custom_dir>/data
     
     Returns:
         Dictionary with all configured paths
@@ -134,7 +135,7 @@ def set_output_directory(custom_dir: str):
     CHECKPOINT_DIR = os.path.join(BASE_DIR, 'checkpoints')
     LOGS_DIR = os.path.join(BASE_DIR, 'logs')
     FAILED_DOIS_FILE = os.path.join(BASE_DIR, 'failed_dois.txt')
-    DATABASE_PATH = os.path.join(DATA_DIR, 'papers.db')
+    DATABASE_PATH = os.path.join(DATA_DIR, database_filename)
     
     # Create directories
     for directory in [BASE_DIR, DATA_DIR, CHECKPOINT_DIR, LOGS_DIR]:
@@ -6,10 +6,15 @@ Uses SQLite for structured storage with JSON export capabilities
 import sqlite3
 import json
 import threading
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Iterator
 from datetime import datetime
 from pathlib import Path
 
+try:
+    import orjson  # Optional: several times faster than json.dumps for large exports
+except ImportError:
+    orjson = None
+
 from .models import PaperMetadata, CollectionStats
 from .config import DATABASE_PATH
 
@@ -17,11 +22,27 @@ from .config import DATABASE_PATH
 class PaperDatabase:
     """SQLite database handler for paper metadata"""
     
+    # Applied on every connection. The collection is append-mostly and re-runnable,
+    # so WAL + synchronous=NORMAL (no fsync per commit; a crash can lose only the
+    # last commits, never corrupt the file) is the right durability trade-off.
+    _CONNECTION_PRAGMAS = (
+        "PRAGMA journal_mode = WAL",        # Readers (exports, scripts) don't block the writer
+        "PRAGMA synchronous = NORMAL",      # Safe with WAL, skips the fsync on every commit
+        "PRAGMA cache_size = -262144",      # Page cache up to 256 MB, keeps the hot B-tree pages resident
+        "PRAGMA temp_store = MEMORY",       # Sort/GROUP BY temp tables stay in RAM
+        "PRAGMA mmap_size = 268435456",     # Memory-map the first 256 MB of the file
+    )
+    
     def __init__(self, db_path: str = DATABASE_PATH):
         """Initialize database connection and create tables if needed"""
         self.db_path = db_path
         self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30.0)
         self.conn.row_factory = sqlite3.Row
+        for pragma in self._CONNECTION_PRAGMAS:
+            self.conn.execute(pragma)
+        # INSERT OR REPLACE must fire the DELETE trigger that keeps papers_fts in sync
+        self.conn.execute("PRAGMA recursive_triggers = ON")
+        self.fts_enabled = False
         # Add thread lock for database operations
         self._lock = threading.Lock()
         self._create_tables()
@@ -85,7 +106,6 @@ class PaperDatabase:
                 print("🔄 Migrating database: Adding 'source' column...")
                 cursor.execute("ALTER TABLE papers ADD COLUMN source TEXT DEFAULT 'PubMed'")
                 cursor.execute("UPDATE papers SET source = 'PubMed' WHERE source IS NULL")
-                self.conn.commit()
                 print("✓ Migration complete: All existing papers marked as 'PubMed'")
             
             
@@ -116,8 +136,137 @@ class PaperDatabase:
                 )
             """)
             
+            # Lookup indexes for get_paper_by_doi and per-query reads
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_papers_doi ON papers(doi)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_papers_query_id ON papers(query_id)")
+            # Covering index for the failed-DOI export's COUNT and txt (doi, pmid, title)
+            # reads; replaces the narrower (is_full_text_pmc, doi) index
+            cursor.execute("DROP INDEX IF EXISTS idx_papers_fulltext_doi")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_papers_fulltext_export "
+                "ON papers(is_full_text_pmc, doi, pmid, title)"
+            )
+            
+            self._create_fts_index(cursor)
+            
             self.conn.commit()
     
+    def _create_fts_index(self, cursor):
+        """
+        Create the FTS5 full-text index over title/abstract, kept in sync by triggers.
+        
+        The index is an external-content table (no duplicated text), so it only
+        stores the inverted index. Skipped if SQLite was built without FTS5.
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'papers_fts'")
+        if cursor.fetchone():
+            self.fts_enabled = True
+            return
+        
+        try:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE papers_fts USING fts5(
+                    title, abstract,
+                    content='papers', content_rowid='rowid',
+                    tokenize='porter unicode61'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            print(f"Full-text search disabled (FTS5 not available: {str(e)})")
+            self.fts_enabled = False
+            return
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS papers_fts_ai AFTER INSERT ON papers BEGIN
+                INSERT INTO papers_fts(rowid, title, abstract)
+                VALUES (new.rowid, new.title, new.abstract);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS papers_fts_ad AFTER DELETE ON papers BEGIN
+                INSERT INTO papers_fts(papers_fts, rowid, title, abstract)
+                VALUES ('delete', old.rowid, old.title, old.abstract);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS papers_fts_au AFTER UPDATE OF title, abstract ON papers BEGIN
+                INSERT INTO papers_fts(papers_fts, rowid, title, abstract)
+                VALUES ('delete', old.rowid, old.title, old.abstract);
+                INSERT INTO papers_fts(rowid, title, abstract)
+                VALUES (new.rowid, new.title, new.abstract);
+            END
+        """)
+        
+        # Index papers that existed before the FTS table
+        cursor.execute("SELECT 1 FROM papers LIMIT 1")
+        if cursor.fetchone():
+            print("🔄 Building full-text index for existing papers...")
+            cursor.execute("INSERT INTO papers_fts(papers_fts) VALUES ('rebuild')")
+            print("✓ Full-text index built")
+        self.fts_enabled = True
+    
+    # Use explicit column names for schema flexibility
+    # This way, adding new columns won't break existing code
+    _PAPER_COLUMNS = (
+        'pmid', 'pmcid', 'doi', 'title', 'abstract', 'full_text', 'full_text_sections',
+        'mesh_terms', 'keywords', 'authors', 'year', 'date_published', 'journal',
+        'is_full_text_pmc', 'oa_url', 'primary_topic', 'topic_name', 'topic_subfield',
+        'topic_field', 'topic_domain', 'citation_normalized_percentile',
+        'cited_by_count', 'fwci', 'collection_date', 'openalex_retrieved',
+        'parsing_status', 'query_id', 'embedding', 'YAKE_keywords', 'source'
+    )
+    
+    _INSERT_PAPER_SQL = f"""
+        INSERT OR REPLACE INTO papers ({', '.join(_PAPER_COLUMNS)})
+        VALUES ({', '.join('?' * len(_PAPER_COLUMNS))})
+    """
+    
+    # Upsert for bulk writes: updates the row in place (same rowid, one UPDATE
+    # trigger) instead of REPLACE's delete + re-insert
+    _UPSERT_PAPER_SQL = f"""
+        INSERT INTO papers ({', '.join(_PAPER_COLUMNS)})
+        VALUES ({', '.join('?' * len(_PAPER_COLUMNS))})
+        ON CONFLICT(pmid) DO UPDATE SET
+            {', '.join(f'{col} = excluded.{col}' for col in _PAPER_COLUMNS if col != 'pmid')}
+    """
+    
+    @staticmethod
+    def _metadata_to_row(metadata: PaperMetadata) -> tuple:
+        """Convert PaperMetadata to a parameter tuple matching _INSERT_PAPER_SQL"""
+        return (
+            metadata.pmid,
+            metadata.pmcid,
+            metadata.doi,
+            metadata.title,
+            metadata.abstract,
+            metadata.full_text,
+            json.dumps(metadata.full_text_sections) if metadata.full_text_sections else None,
+            json.dumps(metadata.mesh_terms),
+            json.dumps(metadata.keywords),
+            json.dumps(metadata.authors),
+            metadata.year,
+            metadata.date_published,
+            metadata.journal,
+            1 if metadata.is_full_text_pmc else 0,
+            metadata.oa_url,
+            json.dumps(metadata.primary_topic) if metadata.primary_topic else None,
+            # Extract individual topic fields
+            metadata.primary_topic.get('display_name') if metadata.primary_topic else None,
+            metadata.primary_topic.get('subfield', {}).get('display_name') if metadata.primary_topic and 'subfield' in metadata.primary_topic else None,
+            metadata.primary_topic.get('field', {}).get('display_name') if metadata.primary_topic and 'field' in metadata.primary_topic else None,
+            metadata.primary_topic.get('domain', {}).get('display_name') if metadata.primary_topic and 'domain' in metadata.primary_topic else None,
+            metadata.citation_normalized_percentile,
+            metadata.cited_by_count,
+            metadata.fwci,
+            metadata.collection_date,
+            1 if metadata.openalex_retrieved else 0,
+            getattr(metadata, 'parsing_status', None),  # May not exist on old metadata
+            metadata.query_id,
+            getattr(metadata, 'embedding', None),  # BLOB, may not exist on old metadata
+            getattr(metadata, 'YAKE_keywords', None),  # May not exist on old metadata
+            getattr(metadata, 'source', 'PubMed')  # Source field
+        )
+    
     def insert_paper(self, metadata: PaperMetadata) -> bool:
         """
         Insert or update a paper in the database.
@@ -131,74 +280,96 @@ class PaperDatabase:
         try:
             with self._lock:
                 cursor = self.conn.cursor()
-                # Use explicit column names for schema flexibility
-                # This way, adding new columns won't break existing code
-                cursor.execute("""
-                    INSERT OR REPLACE INTO papers (
-                        pmid, pmcid, doi, title, abstract, full_text, full_text_sections,
-                        mesh_terms, keywords, authors, year, date_published, journal,
-                        is_full_text_pmc, oa_url, primary_topic, topic_name, topic_subfield,
-                        topic_field, topic_domain, citation_normalized_percentile,
-                        cited_by_count, fwci, collection_date, openalex_retrieved,
-                        parsing_status, query_id, embedding, YAKE_keywords, source
-                    ) VALUES (
-                        ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
-                        ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
-                    )
-                """, (
-                    metadata.pmid,
-                    metadata.pmcid,
-                    metadata.doi,
-                    metadata.title,
-                    metadata.abstract,
-                    metadata.full_text,
-                    json.dumps(metadata.full_text_sections) if metadata.full_text_sections else None,
-                    json.dumps(metadata.mesh_terms),
-                    json.dumps(metadata.keywords),
-                    json.dumps(metadata.authors),
-                    metadata.year,
-                    metadata.date_published,
-                    metadata.journal,
-                    1 if metadata.is_full_text_pmc else 0,
-                    metadata.oa_url,
-                    json.dumps(metadata.primary_topic) if metadata.primary_topic else None,
-                    # Extract individual topic fields
-                    metadata.primary_topic.get('display_name') if metadata.primary_topic else None,
-                    metadata.primary_topic.get('subfield', {}).get('display_name') if metadata.primary_topic and 'subfield' in metadata.primary_topic else None,
-                    metadata.primary_topic.get('field', {}).get('display_name') if metadata.primary_topic and 'field' in metadata.primary_topic else None,
-                    metadata.primary_topic.get('domain', {}).get('display_name') if metadata.primary_topic and 'domain' in metadata.primary_topic else None,
-                    metadata.citation_normalized_percentile,
-                    metadata.cited_by_count,
-                    metadata.fwci,
-                    metadata.collection_date,
-                    1 if metadata.openalex_retrieved else 0,
-                    getattr(metadata, 'parsing_status', None),  # May not exist on old metadata
-                    metadata.query_id,
-                    getattr(metadata, 'embedding', None),  # BLOB, may not exist on old metadata
-                    getattr(metadata, 'YAKE_keywords', None),  # May not exist on old metadata
-                    getattr(metadata, 'source', 'PubMed')  # Source field
-                ))
+                cursor.execute(self._INSERT_PAPER_SQL, self._metadata_to_row(metadata))
                 self.conn.commit()
             return True
         except Exception as e:
             print(f"Error inserting paper {metadata.pmid}: {str(e)}")
             return False
     
-    def insert_papers_batch(self, metadata_list: List[PaperMetadata]) -> int:
+    def insert_papers_batch(self, metadata_list: List[PaperMetadata], failed_dois: List[tuple] = None) -> List[PaperMetadata]:
         """
-        Insert multiple papers in a batch.
+        Insert or update multiple papers in a single transaction.
         
         Args:
             metadata_list: List of PaperMetadata objects
+            failed_dois: Optional (doi, pmid, reason, timestamp) rows to record
+                in failed_dois within the same transaction
             
         Returns:
-            Number of successfully inserted papers
+            List of the papers that were saved (all of them, unless the batch
+            fell back to per-paper inserts and some of those failed)
         """
-        success_count = 0
-        for metadata in metadata_list:
-            if self.insert_paper(metadata):
-                success_count += 1
-        return success_count
+        if not metadata_list and not failed_dois:
+            return []
+        
+        # One transaction for the whole batch: a single commit (and fsync)
+        # instead of one per paper and one per failed DOI
+        try:
+            with self._lock:
+                with self.conn:
+                    if not self.conn.in_transaction:
+                        self.conn.execute("BEGIN IMMEDIATE")  # Take the write lock up front
+                    self.conn.executemany(
+                        self._UPSERT_PAPER_SQL,
+                        [self._metadata_to_row(metadata) for metadata in metadata_list]
+                    )
+                    if failed_dois:
+                        self.conn.executemany(
+                            "INSERT OR REPLACE INTO failed_dois VALUES (?, ?, ?, ?)", failed_dois
+                        )
+            return list(metadata_list)
+        except Exception as e:
+            print(f"Batch insert failed ({str(e)}), falling back to per-paper inserts...")
+        
+        saved = [metadata for metadata in metadata_list if self.insert_paper(metadata)]
+        # Don't record a failed DOI for a paper of this batch that wasn't stored;
+        # rows are matched on (doi, pmid) since Europe PMC papers may lack a PMID
+        saved_keys = {(metadata.doi, metadata.pmid) for metadata in saved}
+        unsaved_keys = {(metadata.doi, metadata.pmid) for metadata in metadata_list} - saved_keys
+        for row in failed_dois or []:
+            if (row[0], row[1]) not in unsaved_keys:
+                self.add_failed_doi(*row)
+        return saved
+    
+    # One UPDATE ... FROM over a JSON array of [abstract, full_text, pmid] rows:
+    # parsed and planned once per batch instead of once per row (SQLite >= 3.33)
+    _UPDATE_TEXTS_JSON_SQL = """
+        UPDATE papers SET abstract = t.abstract, full_text = t.full_text
+        FROM (
+            SELECT json_extract(value, '$[0]') AS abstract,
+                   json_extract(value, '$[1]') AS full_text,
+                   json_extract(value, '$[2]') AS pmid
+            FROM json_each(?)
+        ) AS t
+        WHERE papers.pmid = t.pmid
+    """
+    
+    def update_paper_texts(self, rows: List[tuple]) -> int:
+        """
+        Update abstract and full text of many papers in a single transaction.
+        
+        Args:
+            rows: (abstract, full_text, pmid) tuples
+            
+        Returns:
+            Number of rows updated
+        """
+        if not rows:
+            return 0
+        
+        with self._lock:
+            with self.conn:
+                if not self.conn.in_transaction:
+                    self.conn.execute("BEGIN IMMEDIATE")  # Take the write lock up front
+                try:
+                    cursor = self.conn.execute(self._UPDATE_TEXTS_JSON_SQL, (json.dumps(rows),))
+                except sqlite3.OperationalError:
+                    # Older SQLite without UPDATE ... FROM or JSON1: one statement per row
+                    cursor = self.conn.executemany(
+                        "UPDATE papers SET abstract = ?, full_text = ? WHERE pmid = ?", rows
+                    )
+        return cursor.rowcount
     
     def paper_exists(self, pmid: str) -> bool:
         """
@@ -214,10 +385,106 @@ class PaperDatabase:
             return False
             
         with self._lock:
-            cursor = self.conn.cursor()
+            cursor = self._tuple_cursor()
             cursor.execute("SELECT 1 FROM papers WHERE pmid = ? LIMIT 1", (pmid,))
             return cursor.fetchone() is not None
     
+    # Max values per IN (...) lookup; stays under SQLite's host-parameter limit
+    _IN_CHUNK_SIZE = 500
+    
+    def papers_exist(self, pmids: List[str]) -> set:
+        """
+        Check which of many PMIDs exist, using chunked IN queries.
+        
+        Args:
+            pmids: List of PubMed IDs
+            
+        Returns:
+            Set of the PMIDs that are in the database
+        """
+        return self._existing_values('pmid', pmids)
+    
+    def identifiers_exist(self, identifiers: List[str]) -> set:
+        """
+        Check which of many PMIDs or DOIs exist, without loading the papers.
+        
+        Matches the lookup order of get_papers_needing_enrichment: by PMID first,
+        then the misses by DOI.
+        
+        Args:
+            identifiers: List of PMIDs or DOIs
+            
+        Returns:
+            Set of the identifiers that are in the database
+        """
+        existing = self._existing_values('pmid', identifiers)
+        missing = [i for i in identifiers if i and i not in existing]
+        if missing:
+            existing |= self._existing_values('doi', missing)
+        return existing
+    
+    def get_identifier_set(self) -> set:
+        """
+        Load every stored PMID and DOI into one set, for runs that test
+        membership of many identifiers (same matches as identifiers_exist).
+        """
+        identifiers = set()
+        cursor = self._tuple_cursor()
+        cursor.execute("SELECT pmid, doi FROM papers")
+        for pmid, doi in self._iter_rows(cursor):
+            identifiers.add(pmid)
+            if doi:
+                identifiers.add(doi)
+        identifiers.discard('')
+        return identifiers
+    
+    def _existing_values(self, column: str, values: List[str]) -> set:
+        """Return the subset of `values` present in `column`, using chunked IN queries."""
+        values = list(dict.fromkeys(v for v in values if v))
+        existing = set()
+        
+        with self._lock:
+            cursor = self._tuple_cursor()
+            for i in range(0, len(values), self._IN_CHUNK_SIZE):
+                chunk = values[i:i + self._IN_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f"SELECT {column} FROM papers WHERE {column} IN ({placeholders})", chunk)
+                existing.update(row[0] for row in self._iter_rows(cursor))
+        
+        return existing
+    
+    def find_missing_pmids(self, pmids: List[str]) -> List[str]:
+        """
+        Return the PMIDs that are not in the database yet.
+        
+        The diff runs inside SQLite as an anti-join against a temp table, so
+        only the missing PMIDs are pulled into Python.
+        
+        Args:
+            pmids: List of PubMed IDs
+            
+        Returns:
+            Missing PMIDs, in first-seen input order
+        """
+        if not pmids:
+            return []
+        
+        with self._lock:
+            cursor = self._tuple_cursor()
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS search_pmids (pmid TEXT PRIMARY KEY)")
+            with self.conn:
+                cursor.execute("DELETE FROM search_pmids")
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO search_pmids VALUES (?)",
+                    ((pmid,) for pmid in pmids if pmid)
+                )
+            cursor.execute("""
+                SELECT s.pmid FROM search_pmids s
+                WHERE NOT EXISTS (SELECT 1 FROM papers p WHERE p.pmid = s.pmid)
+                ORDER BY s.rowid
+            """)
+            return [row[0] for row in self._iter_rows(cursor)]
+    
     def paper_exists_by_doi(self, doi: str) -> bool:
         """
         Check if a paper exists in the database by DOI.
@@ -232,7 +499,7 @@ class PaperDatabase:
             return False
         
         with self._lock:
-            cursor = self.conn.cursor()
+            cursor = self._tuple_cursor()
             cursor.execute("SELECT 1 FROM papers WHERE doi = ? LIMIT 1", (doi,))
             return cursor.fetchone() is not None
     
@@ -256,15 +523,74 @@ class PaperDatabase:
         if not paper:
             return (False, None)  # Paper doesn't exist
         
-        # Check if paper needs enrichment
-        needs_enrichment = (
+        return (self._needs_enrichment(paper), paper)
+    
+    # Every code point str.strip() removes (chr(c).isspace()); SQLite's trim()
+    # only strips ASCII spaces by default, which would miss e.g. a scraped &nbsp;
+    _STRIP_CODEPOINTS = (
+        9, 10, 11, 12, 13, 28, 29, 30, 31, 32, 133, 160, 5760,
+        8192, 8193, 8194, 8195, 8196, 8197, 8198, 8199, 8200, 8201, 8202,
+        8232, 8233, 8239, 8287, 12288,
+    )
+    
+    # SQL form of _needs_enrichment, so emptiness is checked without reading the text into Python
+    _NEEDS_ENRICHMENT_SQL = (
+        f"(abstract IS NULL OR trim(abstract, char({', '.join(map(str, _STRIP_CODEPOINTS))})) = '' "
+        "OR full_text IS NULL OR full_text = '')"
+    )
+    
+    def get_papers_needing_enrichment(self, identifiers: List[str]) -> Dict[str, PaperMetadata]:
+        """
+        Batch version of paper_needs_enrichment, returning only the papers to enrich.
+        
+        The missing-content check runs in SQLite, so complete papers are never
+        loaded; only the (usually few) incomplete ones are read as full rows.
+        Identifiers are matched by PMID first, then the misses by DOI.
+        
+        Args:
+            identifiers: List of PMIDs or DOIs
+            
+        Returns:
+            Dict mapping identifier to PaperMetadata for existing papers that
+            are missing abstract or full text
+        """
+        flags = self._needs_enrichment_flags('pmid', identifiers)
+        missing = [i for i in identifiers if i and i not in flags]
+        by_doi = self._needs_enrichment_flags('doi', missing) if missing else {}
+        
+        papers = self.get_papers_by_pmids([i for i, needs in flags.items() if needs])
+        papers.update(self.get_papers_by_dois([i for i, needs in by_doi.items() if needs]))
+        return papers
+    
+    def _needs_enrichment_flags(self, column: str, values: List[str]) -> Dict[str, bool]:
+        """Map each of `values` found in `column` to whether that paper needs enrichment."""
+        values = list(dict.fromkeys(v for v in values if v))
+        flags = {}
+        
+        with self._lock:
+            cursor = self._tuple_cursor()
+            for i in range(0, len(values), self._IN_CHUNK_SIZE):
+                chunk = values[i:i + self._IN_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(
+                    f"SELECT {column}, {self._NEEDS_ENRICHMENT_SQL} FROM papers WHERE {column} IN ({placeholders})",
+                    chunk
+                )
+                for value, needs in self._iter_rows(cursor):
+                    # Keep the first match, like fetchone() in the single lookups
+                    flags.setdefault(value, bool(needs))
+        
+        return flags
+    
+    @staticmethod
+    def _needs_enrichment(paper: PaperMetadata) -> bool:
+        """Check if an existing paper is missing abstract or full text."""
+        return (
             not paper.abstract or 
             not paper.full_text or
             paper.abstract.strip() == "" or
             paper.full_text is None
         )
-        
-        return (needs_enrichment, paper)
     
     def get_paper(self, pmid: str) -> Optional[PaperMetadata]:
         """
@@ -310,26 +636,202 @@ class PaperDatabase:
                 return self._row_to_metadata(row)
             return None
     
+    def get_papers_by_pmids(self, pmids: List[str]) -> Dict[str, PaperMetadata]:
+        """
+        Retrieve many papers by PMID using chunked IN queries.
+        
+        Args:
+            pmids: List of PubMed IDs
+            
+        Returns:
+            Dict mapping PMID to PaperMetadata for the PMIDs that exist
+        """
+        return self._get_papers_where_in('pmid', pmids)
+    
+    def get_papers_by_dois(self, dois: List[str]) -> Dict[str, PaperMetadata]:
+        """
+        Retrieve many papers by DOI using chunked IN queries.
+        
+        Args:
+            dois: List of DOIs
+            
+        Returns:
+            Dict mapping DOI to PaperMetadata for the DOIs that exist
+        """
+        return self._get_papers_where_in('doi', dois)
+    
+    def _get_papers_where_in(self, column: str, values: List[str]) -> Dict[str, PaperMetadata]:
+        """Fetch papers whose `column` is in `values`, keyed by that column."""
+        values = list(dict.fromkeys(v for v in values if v))
+        papers = {}
+        
+        with self._lock:
+            cursor = self.conn.cursor()
+            for i in range(0, len(values), self._IN_CHUNK_SIZE):
+                chunk = values[i:i + self._IN_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f"SELECT * FROM papers WHERE {column} IN ({placeholders})", chunk)
+                for row in self._iter_rows(cursor):
+                    # Keep the first match, like fetchone() in the single lookups
+                    papers.setdefault(row[column], self._row_to_metadata(row))
+        
+        return papers
+    
+    def search_by_text(self, query: str, limit: int = None) -> List[PaperMetadata]:
+        """
+        Full-text search over title and abstract using the FTS5 index.
+        
+        Args:
+            query: FTS5 match expression (e.g. 'senescence AND theory', '"free radical"')
+            limit: Optional maximum number of results (best matches first)
+            
+        Returns:
+            List of PaperMetadata objects ordered by relevance
+        """
+        if not self.fts_enabled:
+            raise RuntimeError("Full-text search is not available (SQLite built without FTS5)")
+        
+        sql = """
+            SELECT p.* FROM papers_fts f
+            JOIN papers p ON p.rowid = f.rowid
+            WHERE papers_fts MATCH ?
+            ORDER BY f.rank
+        """
+        params = [query]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return [self._row_to_metadata(row) for row in rows]
+    
+    def iter_dois_by_mesh_term(self, mesh_term: str) -> Iterator[str]:
+        """
+        Lazily yield DOIs of papers tagged with a MeSH term.
+        
+        A LIKE prefilter on the JSON text narrows candidates in SQLite; only
+        those rows are decoded to confirm an exact term match. Consumers that
+        only need the first few hits (e.g. itertools.islice) stop the scan early.
+        
+        Args:
+            mesh_term: Exact MeSH term (e.g. 'Aging')
+            
+        Yields:
+            DOI strings
+        """
+        if not mesh_term:
+            return
+        
+        # Match the JSON-encoded term including its quotes; escape LIKE wildcards
+        pattern = json.dumps(mesh_term).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        cursor = self._tuple_cursor()
+        cursor.execute("""
+            SELECT doi, mesh_terms FROM papers
+            WHERE doi IS NOT NULL AND doi != ''
+            AND mesh_terms LIKE ? ESCAPE '\\'
+        """, (f"%{pattern}%",))
+        for doi, mesh_terms in self._iter_rows(cursor):
+            if mesh_term in json.loads(mesh_terms):
+                yield doi
+    
+    def get_dois_by_mesh_term(self, mesh_term: str) -> List[str]:
+        """Get all DOIs of papers tagged with a MeSH term"""
+        return list(self.iter_dois_by_mesh_term(mesh_term))
+    
+    def iter_papers_without_fulltext(self) -> Iterator[PaperMetadata]:
+        """Lazily yield papers that don't have full text from PMC, one fetchmany batch at a time"""
+        cursor = self.conn.cursor()
+        # Unary + keeps the planner off the two-valued full-text index: reading
+        # whole rows through it costs a table lookup per row instead of one scan
+        cursor.execute("SELECT * FROM papers WHERE +is_full_text_pmc = 0")
+        for row in self._iter_rows(cursor):
+            yield self._row_to_metadata(row)
+    
     def get_papers_without_fulltext(self) -> List[PaperMetadata]:
         """Get all papers that don't have full text from PMC"""
+        return list(self.iter_papers_without_fulltext())
+    
+    def iter_papers_with_fulltext(self) -> Iterator[PaperMetadata]:
+        """Lazily yield papers that have full text from PMC, one fetchmany batch at a time"""
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM papers WHERE is_full_text_pmc = 0")
-        rows = cursor.fetchall()
-        return [self._row_to_metadata(row) for row in rows]
+        # Full-row read: scan instead of the full-text index (see iter_papers_without_fulltext)
+        cursor.execute("SELECT * FROM papers WHERE +is_full_text_pmc = 1")
+        for row in self._iter_rows(cursor):
+            yield self._row_to_metadata(row)
     
     def get_papers_with_fulltext(self) -> List[PaperMetadata]:
         """Get all papers that have full text from PMC"""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM papers WHERE is_full_text_pmc = 1")
-        rows = cursor.fetchall()
-        return [self._row_to_metadata(row) for row in rows]
+        return list(self.iter_papers_with_fulltext())
     
-    def get_all_papers(self) -> List[PaperMetadata]:
-        """Get all papers from database"""
+    def iter_papers(self, batch_size: int = 1000, limit: int = None) -> Iterator[PaperMetadata]:
+        """
+        Lazily yield all papers, holding at most one fetchmany batch in memory.
+        
+        Args:
+            batch_size: Rows fetched from SQLite per round trip
+            limit: Optional maximum number of papers to yield
+        """
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM papers")
-        rows = cursor.fetchall()
-        return [self._row_to_metadata(row) for row in rows]
+        if limit is not None:
+            cursor.execute("SELECT * FROM papers LIMIT ?", (limit,))
+        else:
+            cursor.execute("SELECT * FROM papers")
+        for row in self._iter_rows(cursor, batch_size):
+            yield self._row_to_metadata(row)
+    
+    def iter_paper_text_batches(self, batch_size: int = 1000) -> Iterator[List[tuple]]:
+        """
+        Yield (pmid, abstract, full_text) rows in batches, paging by rowid.
+        
+        Each batch is its own short read, so no read transaction stays open
+        between batches: the caller can write in between (e.g. with
+        update_paper_texts) without holding back WAL checkpoints.
+        
+        Args:
+            batch_size: Rows per batch
+        """
+        last_rowid = 0  # Auto-assigned rowids start at 1
+        while True:
+            with self._lock:
+                cursor = self._tuple_cursor()
+                cursor.execute(
+                    "SELECT rowid, pmid, abstract, full_text FROM papers "
+                    "WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, batch_size)
+                )
+                rows = cursor.fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            yield [row[1:] for row in rows]
+    
+    def iter_pmids(self, limit: int = None) -> Iterator[str]:
+        """
+        Lazily yield PMIDs only, without building PaperMetadata objects.
+        
+        Args:
+            limit: Optional maximum number of PMIDs to yield
+        """
+        cursor = self._tuple_cursor()
+        if limit is not None:
+            cursor.execute("SELECT pmid FROM papers LIMIT ?", (limit,))
+        else:
+            cursor.execute("SELECT pmid FROM papers")
+        for row in self._iter_rows(cursor):
+            yield row[0]
+    
+    def get_all_papers(self, limit: int = None) -> List[PaperMetadata]:
+        """Get all papers from database (or the first `limit` papers)"""
+        return list(self.iter_papers(limit=limit))
+    
+    def count_papers(self) -> int:
+        """Count papers without loading them"""
+        cursor = self._tuple_cursor()
+        cursor.execute("SELECT COUNT(*) FROM papers")
+        return cursor.fetchone()[0]
     
     def add_failed_doi(self, doi: str, pmid: str, reason: str, timestamp: str):
         """Add a DOI to the failed list"""
@@ -380,13 +882,15 @@ class PaperDatabase:
         self.conn.commit()
         return cursor.lastrowid
     
-    def export_to_json(self, output_path: str = None, compact: bool = True) -> str:
+    def export_to_json(self, output_path: str = None, compact: bool = True, format: str = 'json') -> str:
         """
         Export all papers to JSON file.
         
         Args:
             output_path: Path to output JSON file
             compact: If True, use compact JSON (no indentation, 50-70% smaller and faster)
+            format: 'json' for one JSON array, or 'jsonl' for one paper per line
+                (JSON Lines; readable line by line without loading the whole file)
             
         Returns:
             Path to the exported file
@@ -394,73 +898,114 @@ class PaperDatabase:
         if output_path is None:
             # Derive data directory from database path instead of using imported DATA_DIR
             db_dir = Path(self.db_path).parent
-            output_path = db_dir / "papers_export.json"
+            output_path = db_dir / ("papers_export.jsonl" if format == 'jsonl' else "papers_export.json")
         
         print(f"Exporting papers to JSON (this may take a while for large datasets)...")
-        papers = self.get_all_papers()
-        papers_dict = [paper.to_dict() for paper in papers]
         
         # Use compact format by default (no indentation) for speed and size
         # With 50k papers: compact=~1GB, indent=2.4GB (2.4x larger!)
+        # Papers are streamed one at a time, so memory stays flat regardless of size
+        papers = (paper.to_dict() for paper in self.iter_papers())
         with open(output_path, 'w', encoding='utf-8') as f:
-            if compact:
-                json.dump(papers_dict, f, ensure_ascii=False, separators=(',', ':'))
+            if format == 'jsonl':
+                count = self._write_json_lines(f, papers)
             else:
-                json.dump(papers_dict, f, indent=2, ensure_ascii=False)
+                count = self._write_json_array(f, papers, indent=None if compact else 2)
         
-        print(f"✓ Exported {len(papers)} papers to {output_path}")
+        print(f"✓ Exported {count} papers to {output_path}")
         return str(output_path)
     
+    @staticmethod
+    def _compact_dumps(item) -> str:
+        """Serialize one object as compact JSON, with orjson when it is installed"""
+        if orjson is not None:
+            return orjson.dumps(item).decode('utf-8')
+        return json.dumps(item, ensure_ascii=False, separators=(',', ':'))
+    
+    @classmethod
+    def _write_json_lines(cls, f, items: Iterator[Dict]) -> int:
+        """Stream items to f as JSON Lines (one compact object per line); returns the count"""
+        count = 0
+        for item in items:
+            f.write(cls._compact_dumps(item))
+            f.write('\n')
+            count += 1
+        return count
+    
+    @classmethod
+    def _write_json_array(cls, f, items: Iterator[Dict], indent: int = None, level: int = 0) -> int:
+        """
+        Stream items to f as a JSON array, equivalent to json.dump(list(items), ...).
+        
+        Compact output goes through _compact_dumps (orjson when installed).
+        
+        Args:
+            f: Text file opened for writing
+            items: Iterable of JSON-serializable objects
+            indent: None for compact separators, else spaces per nesting level
+            level: Nesting depth of the array inside an enclosing document
+            
+        Returns:
+            Number of items written
+        """
+        count = 0
+        if indent is None:
+            f.write('[')
+            for item in items:
+                if count:
+                    f.write(',')
+                f.write(cls._compact_dumps(item))
+                count += 1
+            f.write(']')
+            return count
+        
+        # Escaped strings never contain raw newlines, so re-indenting by line is safe
+        inner = '\n' + ' ' * (indent * (level + 1))
+        f.write('[')
+        for item in items:
+            if count:
+                f.write(',')
+            f.write(inner + json.dumps(item, indent=indent, ensure_ascii=False).replace('\n', inner))
+            count += 1
+        f.write('\n' + ' ' * (indent * level) + ']' if count else ']')
+        return count
+    
     def export_failed_dois_to_file(self, output_path: str = None, format: str = 'json') -> str:
         """
         Export failed DOIs to a structured file.
         
         Args:
             output_path: Path to output file
-            format: Output format ('json' or 'txt')
+            format: Output format ('json', 'jsonl' or 'txt')
             
         Returns:
             Path to the exported file
         """
-        papers = self.get_papers_without_fulltext()
+        if format == 'jsonl':
+            if output_path is None:
+                # Derive data directory from database path instead of using imported DATA_DIR
+                db_dir = Path(self.db_path).parent
+                output_path = db_dir / "failed_dois.jsonl"
+            
+            # No envelope: the line count is the total count
+            with open(output_path, 'w', encoding='utf-8') as f:
+                count = self._write_json_lines(f, self._iter_failed_paper_entries())
         
-        if format == 'json':
+        elif format == 'json':
             if output_path is None:
                 # Derive data directory from database path instead of using imported DATA_DIR
                 db_dir = Path(self.db_path).parent
                 output_path = db_dir / "failed_dois.json"
             
-            failed_papers = []
-            for paper in papers:
-                # Extract topic information
-                topic_info = {}
-                if paper.primary_topic:
-                    topic_info = {
-                        'topic_name': paper.primary_topic.get('display_name'),
-                        'topic_subfield': paper.primary_topic.get('subfield', {}).get('display_name') if 'subfield' in paper.primary_topic else None,
-                        'topic_field': paper.primary_topic.get('field', {}).get('display_name') if 'field' in paper.primary_topic else None,
-                        'topic_domain': paper.primary_topic.get('domain', {}).get('display_name') if 'domain' in paper.primary_topic else None
-                    }
-                
-                failed_papers.append({
-                    'pmid': paper.pmid,
-                    'doi': paper.doi,
-                    'title': paper.title,
-                    'journal': paper.journal,
-                    'year': paper.year,
-                    'authors': paper.authors[:3] if paper.authors else [],  # First 3 authors
-                    'abstract': paper.abstract[:200] + '...' if paper.abstract and len(paper.abstract) > 200 else paper.abstract,
-                    'oa_url': paper.oa_url,
-                    'primary_topic': paper.primary_topic,  # Full dictionary for backward compatibility
-                    'topic_info': topic_info,  # Structured topic information
-                    'collection_date': paper.collection_date
-                })
+            # Count first so the envelope can be written before streaming the papers
+            cursor = self._tuple_cursor()
+            cursor.execute("SELECT COUNT(*) FROM papers WHERE is_full_text_pmc = 0")
+            total_count = cursor.fetchone()[0]
             
             with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'total_count': len(failed_papers),
-                    'papers': failed_papers
-                }, f, indent=2, ensure_ascii=False)
+                f.write(f'{{\n  "total_count": {total_count},\n  "papers": ')
+                count = self._write_json_array(f, self._iter_failed_paper_entries(), indent=2, level=1)
+                f.write('\n}')
         
         else:  # txt format
             if output_path is None:
@@ -468,41 +1013,113 @@ class PaperDatabase:
                 db_dir = Path(self.db_path).parent
                 output_path = db_dir / "failed_dois.txt"
             
+            count = 0
+            cursor = self._tuple_cursor()
+            cursor.execute("SELECT doi, pmid, title FROM papers WHERE is_full_text_pmc = 0")
             with open(output_path, 'w', encoding='utf-8') as f:
-                f.write("# Papers without PMC full text\n")
-                f.write("# Format: DOI | PMID | Title\n\n")
-                for paper in papers:
-                    doi = paper.doi if paper.doi else "NO_DOI"
-                    title = paper.title[:80] if paper.title else "NO_TITLE"
-                    f.write(f"{doi} | {paper.pmid} | {title}\n")
-        
-        print(f"Exported {len(papers)} papers without full text to {output_path}")
+                f.write("# Papers without PMC full text\n"
+                        "# Format: DOI | PMID | Title\n\n")
+                # One writelines call per fetchmany batch instead of one write per paper
+                cursor.arraysize = 1000
+                while rows := cursor.fetchmany():
+                    f.writelines(
+                        f"{doi or 'NO_DOI'} | {pmid} | {title[:80] if title else 'NO_TITLE'}\n"
+                        for doi, pmid, title in rows
+                    )
+                    count += len(rows)
+        
+        print(f"Exported {count} papers without full text to {output_path}")
         return str(output_path)
     
-    def get_statistics(self) -> Dict:
-        """Get database statistics"""
+    # Only the columns the failed-DOI summaries use: full_text, sections and the
+    # other JSON columns are never read for this export
+    _FAILED_EXPORT_COLUMNS = (
+        'pmid', 'doi', 'title', 'journal', 'year', 'authors', 'abstract', 'oa_url',
+        'primary_topic', 'topic_name', 'topic_subfield', 'topic_field', 'topic_domain',
+        'collection_date'
+    )
+    
+    def _iter_failed_paper_entries(self) -> Iterator[Dict]:
+        """Lazily yield failed DOI export entries for papers without PMC full text"""
         cursor = self.conn.cursor()
+        cursor.execute(
+            # Most columns aren't in the full-text index, so scan (see iter_papers_without_fulltext)
+            f"SELECT {', '.join(self._FAILED_EXPORT_COLUMNS)} FROM papers WHERE +is_full_text_pmc = 0"
+        )
+        for row in self._iter_rows(cursor):
+            yield self._failed_paper_entry(row)
+    
+    @classmethod
+    def _failed_paper_entry(cls, row: sqlite3.Row) -> Dict:
+        """Summary dict for one paper in the failed DOIs JSON export"""
+        primary_topic = cls._row_primary_topic(row)
+        authors = json.loads(row['authors']) if row['authors'] else []
+        abstract = row['abstract']
         
-        stats = {}
-        cursor.execute("SELECT COUNT(*) FROM papers")
-        stats['total_papers'] = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM papers WHERE is_full_text_pmc = 1")
-        stats['with_fulltext'] = cursor.fetchone()[0]
+        # Extract topic information
+        topic_info = {}
+        if primary_topic:
+            topic_info = {
+                'topic_name': primary_topic.get('display_name'),
+                'topic_subfield': primary_topic.get('subfield', {}).get('display_name') if 'subfield' in primary_topic else None,
+                'topic_field': primary_topic.get('field', {}).get('display_name') if 'field' in primary_topic else None,
+                'topic_domain': primary_topic.get('domain', {}).get('display_name') if 'domain' in primary_topic else None
+            }
         
-        cursor.execute("SELECT COUNT(*) FROM papers WHERE is_full_text_pmc = 0")
-        stats['without_fulltext'] = cursor.fetchone()[0]
+        return {
+            'pmid': row['pmid'],
+            'doi': row['doi'],
+            'title': row['title'],
+            'journal': row['journal'],
+            'year': row['year'],
+            'authors': authors[:3] if authors else [],  # First 3 authors
+            'abstract': abstract[:200] + '...' if abstract and len(abstract) > 200 else abstract,
+            'oa_url': row['oa_url'],
+            'primary_topic': primary_topic,  # Full dictionary for backward compatibility
+            'topic_info': topic_info,  # Structured topic information
+            'collection_date': row['collection_date']
+        }
+    
+    def get_statistics(self) -> Dict:
+        """Get database statistics"""
+        cursor = self._tuple_cursor()
         
-        cursor.execute("SELECT COUNT(*) FROM papers WHERE openalex_retrieved = 1")
-        stats['with_openalex'] = cursor.fetchone()[0]
+        stats = {}
+        # One scan of papers with conditional sums instead of one COUNT per stat
+        cursor.execute("""
+            SELECT COUNT(*),
+                   COALESCE(SUM(is_full_text_pmc = 1), 0),
+                   COALESCE(SUM(is_full_text_pmc = 0), 0),
+                   COALESCE(SUM(openalex_retrieved = 1), 0)
+            FROM papers
+        """)
+        (stats['total_papers'], stats['with_fulltext'],
+         stats['without_fulltext'], stats['with_openalex']) = cursor.fetchone()
         
         cursor.execute("SELECT COUNT(*) FROM failed_dois")
         stats['failed_dois'] = cursor.fetchone()[0]
         
         return stats
     
-    def _row_to_metadata(self, row: sqlite3.Row) -> PaperMetadata:
-        """Convert database row to PaperMetadata object"""
+    def _tuple_cursor(self) -> sqlite3.Cursor:
+        """Cursor returning plain tuples, for scalar and positional reads that don't need sqlite3.Row"""
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        return cursor
+    
+    @staticmethod
+    def _iter_rows(cursor: sqlite3.Cursor, batch_size: int = 1000) -> Iterator[sqlite3.Row]:
+        """Yield rows from an executed cursor in fetchmany() batches instead of one fetchall()"""
+        cursor.arraysize = batch_size
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+            yield from rows
+    
+    @staticmethod
+    def _row_primary_topic(row: sqlite3.Row) -> Optional[Dict]:
+        """Build the primary_topic dict of a row (needs the primary_topic and topic_* columns)"""
         # Load primary_topic from JSON if available, otherwise construct from individual fields
         primary_topic = None
         if row['primary_topic']:
@@ -531,6 +1148,12 @@ class PaperDatabase:
                     'display_name': row['topic_domain']
                 }
         
+        return primary_topic
+    
+    def _row_to_metadata(self, row: sqlite3.Row) -> PaperMetadata:
+        """Convert database row to PaperMetadata object"""
+        primary_topic = self._row_primary_topic(row)
+        
         return PaperMetadata(
             pmid=row['pmid'],
             pmcid=row['pmcid'],
@@ -616,7 +1239,7 @@ class PaperDatabase:
         """
         cursor = self.conn.cursor()
         cursor.execute("SELECT * FROM papers WHERE query_id = ?", (query_id,))
-        return [self._row_to_metadata(row) for row in cursor.fetchall()]
+        return [self._row_to_metadata(row) for row in self._iter_rows(cursor)]
     
     def count_papers_by_query(self, query_id: int) -> int:
         """
@@ -628,12 +1251,16 @@ class PaperDatabase:
         Returns:
             Number of papers
         """
-        cursor = self.conn.cursor()
+        cursor = self._tuple_cursor()
         cursor.execute("SELECT COUNT(*) FROM papers WHERE query_id = ?", (query_id,))
         return cursor.fetchone()[0]
     
     def close(self):
-        """Close database connection"""
+        """Refresh query-planner statistics and close database connection"""
+        try:
+            self.conn.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass  # Stats refresh is best-effort; never block closing
         self.conn.close()
     
     def __enter__(self):
@@ -43,6 +43,9 @@ def search_europepmc(query: str, max_results: int = 5000, include_preprints: boo
     
     cursor = "*"
     
+    # Reuse one connection for every cursorMark page instead of reconnecting per page
+    session = requests.Session()
+    
     while len(all_papers) < max_results:
         params = {
             "query": full_query,
@@ -53,7 +56,7 @@ def search_europepmc(query: str, max_results: int = 5000, include_preprints: boo
         }
         
         try:
-            response = requests.get(base_url, params=params, timeout=30)
+            response = session.get(base_url, params=params, timeout=30)
             
             if response.status_code == 200:
                 data = response.json()
@@ -108,6 +111,7 @@ def search_europepmc(query: str, max_results: int = 5000, include_preprints: boo
             print(f"Error fetching papers: {e}")
             break
     
+    session.close()
     print(f"Found {len(all_papers)} papers matching criteria")
     return all_papers[:max_results]
 
@@ -221,21 +225,35 @@ def get_paper_statistics(papers: List[Dict]) -> Dict:
     Returns:
         Statistics dictionary
     """
-    stats = {
-        'total_papers': len(papers),
-        'with_doi': sum(1 for p in papers if p.get('doi')),
-        'with_pmid': sum(1 for p in papers if p.get('pmid')),
-        'with_pmcid': sum(1 for p in papers if p.get('pmcid')),
-        'preprints': sum(1 for p in papers if p.get('is_preprint')),
-        'published': sum(1 for p in papers if not p.get('is_preprint')),
-        'with_abstract': sum(1 for p in papers if p.get('abstract')),
-        'total_citations': sum(p.get('citation_count', 0) for p in papers),
-        'years': {}
-    }
+    with_doi = with_pmid = with_pmcid = preprints = with_abstract = total_citations = 0
+    years = {}
     
-    # Count by year
+    # Single pass over the papers instead of one generator scan per statistic
     for paper in papers:
+        if paper.get('doi'):
+            with_doi += 1
+        if paper.get('pmid'):
+            with_pmid += 1
+        if paper.get('pmcid'):
+            with_pmcid += 1
+        if paper.get('is_preprint'):
+            preprints += 1
+        if paper.get('abstract'):
+            with_abstract += 1
+        total_citations += paper.get('citation_count', 0)
+        
+        # Count by year
         year = paper.get('year', 'Unknown')
-        stats['years'][year] = stats['years'].get(year, 0) + 1
+        years[year] = years.get(year, 0) + 1
     
-    return stats
+    return {
+        'total_papers': len(papers),
+        'with_doi': with_doi,
+        'with_pmid': with_pmid,
+        'with_pmcid': with_pmcid,
+        'preprints': preprints,
+        'published': len(papers) - preprints,
+        'with_abstract': with_abstract,
+        'total_citations': total_citations,
+        'years': years
+    }
@@ -12,6 +12,11 @@ from .models import PaperMetadata
 from .config import OPENALEX_DELAY, MAX_RETRIES, RETRY_DELAY, OPENALEX_EMAIL, OPENALEX_MAX_REQUESTS_PER_DAY
 
 
+# One pooled HTTP session for all OpenAlex calls: keeps TCP/TLS connections
+# alive across papers and batches instead of a new handshake per request
+_session = requests.Session()
+_session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
 # Shared rate limiter for thread-safe API calls
 _openalex_lock = threading.Lock()
 _last_request_time = 0
@@ -95,7 +100,7 @@ def enrich_with_openalex(metadata: PaperMetadata) -> PaperMetadata:
             # Thread-safe rate limiting (replaces simple sleep)
             _check_and_wait_rate_limit()
             
-            response = requests.get(url, headers=headers, timeout=10)
+            response = _session.get(url, headers=headers, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -219,15 +224,17 @@ def batch_enrich_with_openalex(metadata_list: list[PaperMetadata], batch_size: i
             # Thread-safe rate limiting
             _check_and_wait_rate_limit()
             
-            response = requests.get(url, headers=headers, timeout=30)
+            response = _session.get(url, headers=headers, timeout=30)
             
             if response.status_code == 200:
                 data = response.json()
                 results = data.get('results', [])
                 
-                # Match results back to metadata objects
+                # Match results back to metadata objects (each work DOI is normalized once)
+                found_dois = set()
                 for work in results:
-                    work_doi = work.get('doi', '').replace('https://doi.org/', '').lower()
+                    work_doi = (work.get('doi') or '').replace('https://doi.org/', '').lower()
+                    found_dois.add(work_doi)
                     
                     if work_doi in doi_to_metadata:
                         metadata = doi_to_metadata[work_doi]
@@ -250,11 +257,10 @@ def batch_enrich_with_openalex(metadata_list: list[PaperMetadata], batch_size: i
                         metadata.openalex_retrieved = True
                         enriched.append(metadata)
                 
-                # Add papers that weren't found in OpenAlex
-                found_dois = {work.get('doi', '').replace('https://doi.org/', '').lower() for work in results}
+                # Add papers that weren't found in OpenAlex (batch_dois are already lowercased keys)
                 for doi in batch_dois:
-                    if doi.lower() not in found_dois:
-                        enriched.append(doi_to_metadata[doi.lower()])
+                    if doi not in found_dois:
+                        enriched.append(doi_to_metadata[doi])
                         
             elif response.status_code == 429:
                 print(f"⚠ OpenAlex rate limit (429) during batch fetch, falling back to individual requests...")
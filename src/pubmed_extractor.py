@@ -6,6 +6,7 @@ import time
 import threading
 import re
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List, Tuple, Dict
 from Bio import Entrez
 import xml.etree.ElementTree as ET
@@ -22,6 +23,7 @@ from .config import (
 # Rate limiting setup
 semaphore = threading.BoundedSemaphore(value=MAX_REQUESTS_PER_SEC)
 last_req_time = [0]
+_rate_lock = threading.Lock()  # Serializes start-time reservations across threads
 
 EXTRACT_FIGURES = False
 EXTRACT_TABLES = False
@@ -36,12 +38,14 @@ def safe_ncbi_call(func, *args, **kwargs):
     for attempt in range(MAX_RETRIES):
         try:
             with semaphore:
-                # Respect NCBI rate limit
-                elapsed = time.time() - last_req_time[0]
-                wait = max(0, 1.0/MAX_REQUESTS_PER_SEC - elapsed)
-                if wait:
-                    time.sleep(wait)
-                last_req_time[0] = time.time()
+                # Respect NCBI rate limit: reserve the next start slot under the lock so
+                # concurrent callers are spaced 1/MAX_REQUESTS_PER_SEC apart, not released together
+                with _rate_lock:
+                    now = time.time()
+                    start = max(now, last_req_time[0] + 1.0/MAX_REQUESTS_PER_SEC)
+                    last_req_time[0] = start
+                if start > now:
+                    time.sleep(start - now)
                 return func(*args, **kwargs)
         except Exception as e:
             error_str = str(e)
@@ -70,7 +74,7 @@ def safe_ncbi_call(func, *args, **kwargs):
                 return None
 
 
-def _search_pubmed_with_date_splitting(query: str, target_count: int, use_cache: bool = True) -> List[str]:
+def _search_pubmed_with_date_splitting(query: str, target_count: int, use_cache: bool = True, cache=None) -> List[str]:
     """
     Search PubMed for large result sets by splitting into date ranges.
     This works around PubMed's 10K limit per search.
@@ -79,6 +83,7 @@ def _search_pubmed_with_date_splitting(query: str, target_count: int, use_cache:
         query: PubMed search query
         target_count: Target number of PMIDs to retrieve
         use_cache: Whether to cache results
+        cache: Already-loaded QueryCache to store results in (loaded from disk if None)
         
     Returns:
         List of PMIDs
@@ -172,7 +177,8 @@ def _search_pubmed_with_date_splitting(query: str, target_count: int, use_cache:
     # Cache the results
     pmid_list = list(all_pmids)
     if use_cache:
-        cache = QueryCache()
+        if cache is None:
+            cache = QueryCache()
         cache.set(query, pmid_list)
     
     return pmid_list
@@ -201,7 +207,8 @@ def search_pubmed(query: str, max_results: int = 50000, use_cache: bool = True)
     else:
         Entrez.api_key = None
     
-    # Check cache first
+    # Check cache first (the loaded cache is reused below to store new results)
+    cache = None
     if use_cache:
         cache = QueryCache()
         cached_pmids = cache.get(query)
@@ -243,7 +250,7 @@ def search_pubmed(query: str, max_results: int = 50000, use_cache: bool = True)
     if num_to_retrieve > 10000:
         print(f"Large result set detected ({num_to_retrieve:,} papers)")
         print(f"Splitting query by date ranges to retrieve all results...")
-        return _search_pubmed_with_date_splitting(query, num_to_retrieve, use_cache)
+        return _search_pubmed_with_date_splitting(query, num_to_retrieve, use_cache, cache)
     
     batch_size = 5000  # Conservative batch size
     all_ids = []
@@ -286,16 +293,42 @@ def search_pubmed(query: str, max_results: int = 50000, use_cache: bool = True)
     
     # Cache the results
     if use_cache:
-        cache = QueryCache()
         cache.set(query, all_ids)
     
     return all_ids
 
 
+def _search_pmid_for_doi(doi: str) -> Optional[str]:
+    """Search PubMed for a single DOI; returns its PMID or None if not found"""
+    # Search for single DOI (without field specifier to avoid 400 errors)
+    # PubMed will automatically match DOIs in the search
+    handle = safe_ncbi_call(
+        Entrez.esearch,
+        db="pubmed",
+        term=doi,
+        retmax=1
+    )
+    
+    if not handle:
+        return None
+    
+    try:
+        record = Entrez.read(handle)
+        handle.close()
+        
+        if record["IdList"]:
+            # Found the paper - get PMID
+            return record["IdList"][0]
+    except Exception as e:
+        print(f"Error searching DOI {doi}: {e}")
+    return None
+
+
 def search_pubmed_by_dois(dois: List[str]) -> Dict[str, str]:
     """
     Search PubMed for papers by their DOIs and return mapping of DOI to PMID.
-    Searches DOIs individually to avoid HTTP 400 errors with batch queries.
+    Searches DOIs individually to avoid HTTP 400 errors with batch queries;
+    the searches run concurrently, paced by the shared safe_ncbi_call rate limiter.
     
     Args:
         dois: List of DOIs
@@ -315,40 +348,18 @@ def search_pubmed_by_dois(dois: List[str]) -> Dict[str, str]:
     
     print(f"Searching PubMed for {len(dois)} DOIs (individual searches)...")
     
-    # Search each DOI individually to avoid query length issues
-    for i, doi in enumerate(dois):
-        if (i + 1) % 10 == 0:
-            print(f"  Processed {i + 1}/{len(dois)} DOIs...")
-        
-        # Search for single DOI (without field specifier to avoid 400 errors)
-        # PubMed will automatically match DOIs in the search
-        query = doi
-        
-        handle = safe_ncbi_call(
-            Entrez.esearch,
-            db="pubmed",
-            term=query,
-            retmax=1
-        )
-        
-        if not handle:
-            not_found.append(doi)
-            continue
-        
-        try:
-            record = Entrez.read(handle)
-            handle.close()
+    # One worker per allowed request/second: overlaps request latency while
+    # safe_ncbi_call keeps the combined rate under MAX_REQUESTS_PER_SEC
+    with ThreadPoolExecutor(max_workers=MAX_REQUESTS_PER_SEC) as executor:
+        # map() yields in input order, so progress and results match the DOI list
+        for i, (doi, pmid) in enumerate(zip(dois, executor.map(_search_pmid_for_doi, dois))):
+            if (i + 1) % 10 == 0:
+                print(f"  Processed {i + 1}/{len(dois)} DOIs...")
             
-            if record["IdList"]:
-                # Found the paper - get PMID
-                pmid = record["IdList"][0]
+            if pmid:
                 doi_to_pmid[doi] = pmid
             else:
                 not_found.append(doi)
-                
-        except Exception as e:
-            print(f"Error searching DOI {doi}: {e}")
-            not_found.append(doi)
     
     print(f"\nFound {len(doi_to_pmid)} papers in PubMed")
     if not_found:
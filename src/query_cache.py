@@ -41,8 +41,9 @@ class QueryCache:
     def _save_cache(self):
         """Save cache to disk"""
         try:
+            # Compact: indent=2 put every cached PMID on its own line (~1.6x the file size)
             with open(self.cache_file, 'w') as f:
-                json.dump(self.cache, f, indent=2)
+                json.dump(self.cache, f, separators=(',', ':'))
         except Exception as e:
             print(f"Warning: Could not save cache: {e}")
     
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test that the SQL enrichment check (get_papers_needing_enrichment) flags
+exactly the same papers as the Python check (_needs_enrichment), including
+abstracts made only of Unicode whitespace such as a scraped &nbsp;
+"""
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import PaperMetadata
+from src.database import PaperDatabase
+
+# Every code point str.strip() removes must be in the SQL trim set, and nothing else
+whitespace = [chr(c) for c in range(sys.maxunicode + 1) if chr(c).isspace()]
+if [ord(c) for c in whitespace] != list(PaperDatabase._STRIP_CODEPOINTS):
+    print("✗ FAIL: PaperDatabase._STRIP_CODEPOINTS does not match str.isspace()")
+    sys.exit(1)
+
+abstracts = [None, "", "abstract", " abstract ", "\u200b", "\ufeff"] + whitespace + [
+    "".join(whitespace),
+    whitespace[0] + "abstract" + whitespace[-1],
+]
+full_texts = [None, "", " ", "full text"]
+
+papers = []
+for abstract in abstracts:
+    for full_text in full_texts:
+        pmid = str(len(papers) + 1)
+        papers.append(PaperMetadata(pmid=pmid, doi=f"10.0/{pmid}", abstract=abstract, full_text=full_text))
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    db = PaperDatabase(db_path=os.path.join(tmp_dir, "papers.db"))
+    db.insert_papers_batch(papers)
+
+    sql_flagged = set(db.get_papers_needing_enrichment([p.pmid for p in papers]))
+    python_flagged = {p.pmid for p in papers if db._needs_enrichment(db.get_paper(p.pmid))}
+    db.close()
+
+mismatched = sorted(sql_flagged ^ python_flagged, key=int)
+
+print("="*70)
+print(f"Papers checked: {len(papers)}")
+print(f"Flagged by SQL: {len(sql_flagged)}, by Python: {len(python_flagged)}")
+for pmid in mismatched:
+    paper = papers[int(pmid) - 1]
+    print(f"  ✗ PMID {pmid}: abstract={paper.abstract!r} full_text={paper.full_text!r}")
+print("="*70)
+
+if mismatched:
+    print(f"RESULTS: {len(mismatched)} mismatches")
+    sys.exit(1)
+print("RESULTS: SQL and Python checks agree")